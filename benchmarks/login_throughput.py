@@ -0,0 +1,63 @@
+"""Login throughput and event-loop responsiveness: bcrypt inline vs. on the bounded pool.
+
+Simulates a burst of concurrent logins (password verification only, no database) while a
+heartbeat task measures how late the event loop wakes it up, i.e. how long every other
+request would be stalled.
+
+    python -m benchmarks.login_throughput --logins 64 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from shared.utils import auth_utils
+
+
+async def _heartbeat(lags: list, stop: asyncio.Event, interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def _run(mode: str, logins: int, hashed: str) -> dict:
+    lags, stop = [], asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    await asyncio.sleep(0)
+
+    async def login():
+        if mode == "inline":
+            return auth_utils.verify_password("correct horse battery staple", hashed)
+        return await auth_utils.averify_password("correct horse battery staple", hashed)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+    assert all(results)
+    return {
+        "mode": mode,
+        "logins_per_s": round(logins / elapsed, 1),
+        "wall_s": round(elapsed, 3),
+        "loop_lag_p50_ms": round(statistics.median(lags), 2) if lags else None,
+        "loop_lag_max_ms": round(max(lags), 2) if lags else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=auth_utils.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+
+    hashed = auth_utils.get_password_hash("correct horse battery staple", rounds=args.rounds)
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {auth_utils.PASSWORD_HASH_WORKERS} hash workers")
+    for mode in ("inline", "offloaded"):
+        print(asyncio.run(_run(mode, args.logins, hashed)))
+    print(auth_utils.password_hash_stats())
+    auth_utils.shutdown_password_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Latency of the hot policy query shapes with and without the declared indexes.
+
+Seeds a throwaway database (never the application's) with N policy documents spread over
+U users, then times each query shape before and after creating POLICY_INDEXES.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.policy_query_latency --policies 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from bson import ObjectId
+from shared.utils.mongo import get_mongo_client, close_mongo_client
+from shared.utils.mongo_indexes import POLICY_INDEXES
+
+BENCH_DB = "claimsense_bench"
+
+
+def _policy(user_id: ObjectId) -> dict:
+    return {
+        "user_id": user_id,
+        "policy_metadata": {"policy_id_uin": f"UIN{random.randrange(10**8)}", "insurer": "Bench Insurer",
+                            "policy_name": "Bench Plan", "overall_security_score": random.uniform(30, 95)},
+        "co_pay": {"percentage": random.choice([0, 10, 20])},
+        "room_rent_limit": {"limit_type": random.choice(["NO_LIMIT", "PERCENTAGE", "CATEGORY"])},
+        "sum_insured": random.choice([300000, 500000, 1000000]),
+        "plain_english_summary": "x" * 400,
+    }
+
+
+async def _seed(collection, policies: int, users: int, batch: int = 10000):
+    user_ids = [ObjectId() for _ in range(users)]
+    for start in range(0, policies, batch):
+        await collection.insert_many([_policy(random.choice(user_ids)) for _ in range(min(batch, policies - start))])
+    return user_ids
+
+
+async def _time(fn, samples: int) -> dict:
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"p50_ms": round(statistics.median(latencies), 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)}
+
+
+async def _measure(collection, user_ids, policy_ids, samples: int) -> dict:
+    return {
+        "find_by_user": await _time(
+            lambda: collection.find({"user_id": random.choice(user_ids)}).to_list(length=None), samples),
+        "find_one_by_user": await _time(lambda: collection.find_one({"user_id": random.choice(user_ids)}), samples),
+        "find_by_id_and_user": await _time(
+            lambda: collection.find_one({"_id": random.choice(policy_ids[0]), "user_id": policy_ids[1]}), samples),
+    }
+
+
+async def main(policies: int, users: int, samples: int, keep: bool):
+    collection = get_mongo_client()[BENCH_DB].policies
+    await collection.drop()
+    print(f"Seeding {policies} policies over {users} users...")
+    start = time.perf_counter()
+    user_ids = await _seed(collection, policies, users)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
+    owner = user_ids[0]
+    owned = [doc["_id"] async for doc in collection.find({"user_id": owner}, projection={"_id": 1})]
+    print("without indexes:", await _measure(collection, user_ids, (owned, owner), samples))
+    start = time.perf_counter()
+    await collection.create_indexes(POLICY_INDEXES)
+    print(f"Indexes built in {time.perf_counter() - start:.1f}s")
+    print("with indexes:   ", await _measure(collection, user_ids, (owned, owner), samples))
+    if not keep:
+        await get_mongo_client().drop_database(BENCH_DB)
+    close_mongo_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policies", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database afterwards")
+    args = parser.parse_args()
+    asyncio.run(main(args.policies, args.users, args.samples, args.keep))
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from services.user_service.src.api.user_routes import router
 from services.user_service.src.middleware.logging_middleware import LoggingMiddleware
@@ -7,10 +8,37 @@ from services.policy_intelligence_service.api.v1.policies import router as polic
 from services.policy_intelligence_service.api.v1.chat import router as chat_router  # Add chat router import
 from services.shadow_claim_simulator.routes.simulation import router as simulation_router
 from services.policy_recommendation_service.api.policy_api import router as policy_recommendation_router
+from services.policy_intelligence_service.worker import ingestion_queue
+from services.policy_intelligence_service.services.ocr_engine import shutdown_executor
+from services.policy_intelligence_service.services.upload_buffer import UploadSizeLimitMiddleware
+from services.policy_intelligence_service.services.ingest_cache import cache_stats
+from services.policy_intelligence_service.services.policy_cache import policy_cache_stats
+from services.policy_intelligence_service.services.answer_cache import answer_cache_stats
+from services.shadow_claim_simulator.services.compiled_policy import compiled_policy_stats
+from shared.utils.llm_registry import get_llm_registry, close_llm_registry
+from shared.utils.embedding_cache import embedding_cache_stats
+from shared.utils.mongo import get_mongo_client, close_mongo_client
+from shared.utils.mongo_indexes import ensure_indexes
+from shared.utils.auth_middleware import auth_stats
+from shared.utils.auth_utils import password_hash_stats, shutdown_password_executor
 
-app = FastAPI(title="Dreamflow Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_mongo_client()
+    await ensure_indexes()
+    get_llm_registry()
+    await ingestion_queue.start()
+    yield
+    await ingestion_queue.stop()
+    shutdown_executor()
+    await close_llm_registry()
+    shutdown_password_executor()
+    close_mongo_client()
+
+app = FastAPI(title="Dreamflow Backend", version="1.0.0", lifespan=lifespan)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(ErrorHandlerMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)  # outermost, so oversized uploads are refused before anything reads them
 app.include_router(router)
 app.include_router(upload_router, prefix="/policy", tags=["policy"])
 app.include_router(policies_router, prefix="/policy", tags=["policy"])
@@ -22,6 +50,19 @@ app.include_router(policy_recommendation_router, prefix="/policy-recommendation"
 async def root():
     return {"message": "Welcome to the ClaimSense Backend API"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "llm": get_llm_registry().stats(),
+        "ingestion_cache": cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "policy_cache": policy_cache_stats(),
+        "answer_cache": answer_cache_stats(),
+        "auth": auth_stats(),
+        "password_hashing": password_hash_stats(),
+        "compiled_policies": compiled_policy_stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
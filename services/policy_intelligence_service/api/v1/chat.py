@@ -1,69 +1,199 @@
-from fastapi import APIRouter, HTTPException, Depends
+import json
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from langchain_pinecone import PineconeVectorStore as LangchainPinecone
-from langchain_mistralai import MistralAIEmbeddings, ChatMistralAI
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from pinecone import Pinecone
 from shared.utils.auth_middleware import get_current_user
-from services.policy_intelligence_service.db.session import get_db
-from bson import ObjectId
-import os
-from dotenv import load_dotenv
-load_dotenv()
+from shared.utils.llm_registry import get_llm_registry
+from services.policy_intelligence_service.services.vector_store import PolicyRetriever, policy_document_id
+from services.policy_intelligence_service.services.policy_cache import get_policy
+from services.policy_intelligence_service.services import answer_cache, intent_router, lexical_index
+from services.policy_intelligence_service.core.config import (
+    CHAT_RETRIEVAL_K, LEXICAL_ONLY_MAX_TERMS, INTENT_ROUTER_ENABLED
+)
 
 router = APIRouter()
 
+CHAT_MODEL = "mistral-small-2506"
+RETRIEVER_CACHE_SIZE = 1024
+
+prompt = ChatPromptTemplate.from_template(
+    "Answer the following question based only on the provided context:\n\n{context}\n\nQuestion: {input}"
+)
+output_parser = StrOutputParser()
+
+# Retrievers are kept per (namespace, policy filter) so repeat messages reuse the same handle
+_retrievers: "OrderedDict[tuple, PolicyRetriever]" = OrderedDict()
+
+
 class ChatRequest(BaseModel):
     query: str
     policy_id: str = None  # Optional policy_id for specific policy searches
 
+
+def get_retriever(namespace: str, document_id: str = None) -> PolicyRetriever:
+    key = (namespace, document_id)
+    retriever = _retrievers.get(key)
+    if retriever is None:
+        search_filter = {"policy_id": document_id} if document_id else None
+        retriever = PolicyRetriever(namespace=namespace, search_filter=search_filter, k=CHAT_RETRIEVAL_K)
+        _retrievers[key] = retriever
+        while len(_retrievers) > RETRIEVER_CACHE_SIZE:
+            _retrievers.popitem(last=False)
+    else:
+        _retrievers.move_to_end(key)
+    return retriever
+
+
+def format_context(docs: List[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+async def resolve_policy(request: ChatRequest, current_user: str) -> Optional[dict]:
+    if not request.policy_id:
+        return None
+    policy = await get_policy(request.policy_id, current_user)
+    if not policy:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return policy
+
+
+def route_intent(query: str, policy: Optional[dict]) -> Optional[dict]:
+    """Questions about a single stored DNA field are answered from the policy document:
+    no embedding, no vector search, no LLM."""
+    if not INTENT_ROUTER_ENABLED or policy is None:
+        return None
+    return intent_router.route(query, policy)
+
+
+def cited_chunks(docs: List[Document]) -> List[dict]:
+    return [
+        {"id": doc.metadata.get("id"), "policy_id": doc.metadata.get("policy_id"), "page": doc.metadata.get("page"),
+         "score": doc.metadata.get("score")}
+        for doc in docs
+    ]
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def prepare(request: ChatRequest, current_user: str, policy: Optional[dict]):
+    """Resolve the policy scope, its BM25 indexes and the question embedding once; the vector
+    serves both the answer cache lookup and retrieval. Short keyword queries the BM25 index
+    covers are not embedded at all (vector is None)."""
+    document_id = policy_document_id(policy) if policy else None
+    retriever = get_retriever(current_user, document_id)
+    indexes = await retriever.aindexes()
+    if lexical_index.is_lexical_query(indexes, request.query, LEXICAL_ONLY_MAX_TERMS):
+        return retriever, document_id, None, indexes
+    vector = await get_llm_registry().embeddings().aembed_query(request.query)
+    return retriever, document_id, vector, indexes
+
+
+async def retrieve(retriever: PolicyRetriever, query: str, vector, indexes) -> List[Document]:
+    if vector is None:
+        return await retriever.alexical_search(query, indexes)
+    return await retriever.ahybrid_search(query, vector, indexes)
+
+
+async def build_messages(query: str, docs: List[Document]):
+    prompt_value = await prompt.ainvoke({"context": format_context(docs), "input": query})
+    return prompt_value.to_messages()
+
+
 @router.post("/chat")
 async def chat_with_policy(request: ChatRequest, current_user: str = Depends(get_current_user)):
     try:
-        embeddings = MistralAIEmbeddings(api_key=os.getenv("MISTRAL_API_KEY"))
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        index = pc.Index("policies")
-        vector_store = LangchainPinecone.from_existing_index(
-            index_name="policies",   # ✅ string
-            embedding=embeddings,
-            namespace=current_user
-        )
-       
-        
-        if request.policy_id:
-            db = get_db()
-            policy = db.policies.find_one({"_id": ObjectId(request.policy_id)})
-            if not policy:
-                raise HTTPException(status_code=404, detail="Policy not found")
-            policy_id_uin = policy["policy_metadata"]["policy_id_uin"]
-            search_filter = {"policy_id": policy_id_uin}
-        else:
-            search_filter = {}
-        retriever = vector_store.as_retriever(search_kwargs={"filter": search_filter, "k": 5})
-        
-        # Fix: Use ainvoke instead of aget_relevant_documents
-        docs = await retriever.ainvoke(request.query)
-        # Debugging logs
-        
-        llm = ChatMistralAI(api_key=os.getenv("MISTRAL_API_KEY"), model_name="mistral-small-2506")
-        
-        # Modern LCEL RAG chain
-        prompt = ChatPromptTemplate.from_template(
-            "Answer the following question based only on the provided context:\n\n{context}\n\nQuestion: {input}"
-        )
-        chain = (
-            {"context": retriever, "input": RunnablePassthrough()}
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
-        
-        response = await chain.ainvoke(request.query)
-        
-        return {"response": response}
+        policy = await resolve_policy(request, current_user)
+        routed = route_intent(request.query, policy)
+        if routed:
+            return {"response": routed["answer"], "intent": routed["intent"]}
+        retriever, document_id, vector, indexes = await prepare(request, current_user, policy)
+        cached = answer_cache.lookup(current_user, document_id, vector)
+        if cached:
+            return {"response": cached["answer"], "cached": True}
+        docs = await retrieve(retriever, request.query, vector, indexes)
+        message = await get_llm_registry().ainvoke(CHAT_MODEL, await build_messages(request.query, docs))
+        answer = output_parser.invoke(message)
+        answer_cache.store(current_user, document_id, vector, request.query, answer, cited_chunks(docs))
+        return {"response": answer}
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(traceback.format_exc()) # Print full error to console for easier debugging
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+
+@router.post("/chat/stream")
+async def stream_chat_with_policy(request: ChatRequest, http_request: Request,
+                                  current_user: str = Depends(get_current_user)):
+    """Server-sent events: one `retrieval` event with the cited chunks, `token` events as the
+    model generates, then `done` (or `error`). The upstream LLM call stops if the client leaves."""
+    start = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - start) * 1000, 2)
+
+    async def single_answer_events(answer: str, chunks: List[dict], **extra):
+        # Answers that need no generation are sent as one token event
+        yield sse_event("retrieval", {"chunks": chunks, "retrieval_ms": elapsed_ms(), **extra})
+        yield sse_event("token", {"text": answer})
+        yield sse_event("done", {"ttft_ms": elapsed_ms(), "total_ms": elapsed_ms(), **extra})
+
+    try:
+        policy = await resolve_policy(request, current_user)
+        routed = route_intent(request.query, policy)
+        if routed:
+            return StreamingResponse(single_answer_events(routed["answer"], [], intent=routed["intent"]),
+                                     media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+        retriever, document_id, vector, indexes = await prepare(request, current_user, policy)
+        cached = answer_cache.lookup(current_user, document_id, vector)
+        if cached:
+            return StreamingResponse(single_answer_events(cached["answer"], cached["chunks"], cached=True),
+                                     media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+        docs = await retrieve(retriever, request.query, vector, indexes)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+    async def events():
+        chunks = cited_chunks(docs)
+        yield sse_event("retrieval", {"chunks": chunks, "retrieval_ms": elapsed_ms()})
+        first_token_ms = None
+        tokens = []
+        stream = None
+        try:
+            stream = get_llm_registry().astream(CHAT_MODEL, await build_messages(request.query, docs))
+            async for chunk in stream:
+                if await http_request.is_disconnected():
+                    break
+                token = output_parser.invoke(chunk)
+                if not token:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = elapsed_ms()
+                tokens.append(token)
+                yield sse_event("token", {"text": token})
+            else:
+                # Only complete answers are cached
+                answer_cache.store(current_user, document_id, vector, request.query, "".join(tokens), chunks)
+                yield sse_event("done", {"ttft_ms": first_token_ms, "total_ms": elapsed_ms()})
+        except Exception as e:
+            print(f"Error streaming chat response: {e}")
+            yield sse_event("error", {"detail": f"Error processing query: {str(e)}"})
+        finally:
+            # Closing the generator cancels the in-flight LLM request
+            if stream is not None:
+                await stream.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
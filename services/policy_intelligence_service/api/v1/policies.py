@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 from services.policy_intelligence_service.db.session import get_db
 from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
+from services.policy_intelligence_service.schemas.policy_list_schema import (
+    LISTABLE_FIELDS, CARD_PROJECTION, PolicyCard, PolicyPage
+)
 from services.policy_intelligence_service.services.risk_analyzer import analyze_risks
+from services.policy_intelligence_service.services.policy_cache import invalidate_policy
+from services.policy_intelligence_service.services import answer_cache, lexical_index
+from services.policy_intelligence_service.services.vector_store import policy_document_id
 from shared.utils.auth_middleware import get_current_user
 from bson import ObjectId
+from bson.errors import InvalidId
 
 router = APIRouter()
 
@@ -11,7 +19,7 @@ router = APIRouter()
 @router.get("/policies/{policy_id}")
 async def get_policy(policy_id: str, current_user: str = Depends(get_current_user)):
     db = get_db()
-    policy = db.policies.find_one({"_id": ObjectId(policy_id), "user_id": ObjectId(current_user)})
+    policy = await db.policies.find_one({"_id": ObjectId(policy_id), "user_id": ObjectId(current_user)})
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     policy["_id"] = str(policy["_id"])
@@ -22,16 +30,55 @@ async def get_policy(policy_id: str, current_user: str = Depends(get_current_use
 @router.delete("/policies/{policy_id}")
 async def delete_policy(policy_id: str, current_user: str = Depends(get_current_user)):
     db = get_db()
-    result = db.policies.delete_one({"_id": ObjectId(policy_id), "user_id": ObjectId(current_user)})
-    if result.deleted_count == 0:
+    deleted = await db.policies.find_one_and_delete(
+        {"_id": ObjectId(policy_id), "user_id": ObjectId(current_user)},
+        projection={"text_hash": 1, "policy_metadata.policy_id_uin": 1}
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Policy not found")
+    invalidate_policy(policy_id, current_user)
+    document_id = policy_document_id(deleted)
+    answer_cache.invalidate(current_user, document_id)
+    # The same document uploaded twice shares one index; keep it while another copy remains
+    key_field = "text_hash" if deleted.get("text_hash") else "policy_metadata.policy_id_uin"
+    if document_id and not await db.policies.count_documents(
+            {"user_id": ObjectId(current_user), key_field: document_id}, limit=1):
+        lexical_index.drop_index(current_user, document_id)
     return {"message": "Policy deleted"}
 
-@router.get("/policies")
-async def get_policies(current_user: str = Depends(get_current_user)):
+@router.get("/policies", response_model=PolicyPage)
+async def get_policies(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return instead of the card view, or 'all'"),
+    current_user: str = Depends(get_current_user)
+):
+    # Keyset pagination on _id: served by the (user_id, _id) index, no skip cost on deep pages
+    query = {"user_id": ObjectId(current_user)}
+    if cursor:
+        try:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if fields is None:
+        projection = CARD_PROJECTION
+    elif fields == "all":
+        projection = {"user_id": 0}
+    else:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - LISTABLE_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection = {field: 1 for field in requested}
+
     db = get_db()
-    policies = list(db.policies.find({"user_id": ObjectId(current_user)}))
-    for policy in policies:
-        policy["_id"] = str(policy["_id"])
-        policy["user_id"] = str(policy["user_id"])
-    return policies
+    page = db.policies.find(query, projection=projection).sort("_id", 1).limit(limit + 1)
+    docs = await page.to_list(length=limit + 1)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    docs = docs[:limit]
+    if fields is None:
+        items = [PolicyCard.from_doc(doc).model_dump() for doc in docs]
+    else:
+        items = [{**doc, "_id": str(doc["_id"])} for doc in docs]
+    return PolicyPage(items=items, next_cursor=next_cursor)
@@ -1,42 +1,47 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
-import shutil
-import os
-import tempfile
-from services.policy_intelligence_service.services.ocr_engine import process_pdf
-from services.policy_intelligence_service.services.llm_parser import PolicyParser
-from services.policy_intelligence_service.services.risk_analyzer import analyze_risks
-from services.policy_intelligence_service.db.session import get_db, get_users_collection
+import asyncio
 from shared.utils.auth_middleware import get_current_user
 from bson import ObjectId
-from services.policy_intelligence_service.worker import process_policy  # Add import
-from services.policy_intelligence_service.services.vector_store import index_policy_for_rag  # Add import for vector indexing
+from services.policy_intelligence_service.worker import ingestion_queue
+from services.policy_intelligence_service.schemas.job_schema import JobStatusResponse
+from services.policy_intelligence_service.services.ingest_cache import cache_stats
+from services.policy_intelligence_service.services.upload_buffer import read_upload, UploadTooLargeError
 
 router = APIRouter()
-parser = PolicyParser()
 
-@router.post("/upload")
+
+@router.post("/upload", status_code=202)
 async def upload_pdf(file: UploadFile = File(...), sum_insured: float = Form(...), current_user: str = Depends(get_current_user)):
-    temp_dir = tempfile.gettempdir()
-    file_path = os.path.join(temp_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    # Sequential processing
-    text = process_pdf(file_path)
-    parsed = await parser.parse_text_to_dna(text)
-    risks = analyze_risks(parsed)
-    parsed.risk_analysis.negative_features = risks
-    db = get_db()
-    policy_doc = parsed.model_dump()
-    policy_doc["sum_insured"] = sum_insured
     try:
-        policy_doc["user_id"] = ObjectId(current_user)
+        ObjectId(current_user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid user ID: {str(e)}")
-    result = db.policies.insert_one(policy_doc)
-    # Index the policy text in Pinecone for RAG, using policy_id as reference
     try:
-        index_policy_for_rag(parsed.policy_metadata.policy_id_uin, text, current_user)
-    except Exception as e:
-        print(f"Error indexing policy for RAG: {str(e)}")
-    os.remove(file_path)
-    return {"message": "PDF processed and saved", "id": str(result.inserted_id)}
+        upload = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = await ingestion_queue.submit(upload, sum_insured, current_user)
+    except asyncio.QueueFull:
+        upload.close()
+        raise HTTPException(status_code=503, detail="Ingestion queue is full, please retry shortly")
+    return {"message": "PDF accepted for processing", "job_id": job.job_id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str, current_user: str = Depends(get_current_user)):
+    job = ingestion_queue.get(job_id)
+    if not job or job.user_id != current_user:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(
+        progress=job.progress,
+        critical_path=job.critical_path(),
+        **job.model_dump(exclude={"user_id", "filename", "sum_insured"})
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: str = Depends(get_current_user)):
+    return cache_stats()
@@ -8,3 +8,62 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/policy_intelligenc
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = os.getenv("PINECONE_ENV")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# In-process ingestion worker pool
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "50"))
+INGEST_JOB_RETENTION = int(os.getenv("INGEST_JOB_RETENTION", "1000"))
+
+# PDF text extraction
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_PARALLEL_MIN_PAGES = int(os.getenv("OCR_PARALLEL_MIN_PAGES", "40"))
+OCR_PAGES_PER_TASK = int(os.getenv("OCR_PAGES_PER_TASK", "16"))
+
+# Background LLM pass that appends extra risks after the deterministic risk engine
+RISK_LLM_ENRICHMENT = os.getenv("RISK_LLM_ENRICHMENT", "true").lower() == "true"
+
+# Upload buffering: uploads stay in memory up to the spool threshold, then spill to a temp file
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Policy parsing: "single" sends the whole document in one call, "chunked" map-reduces over
+# sections, "fields" fans out one small prompt per PolicyDNA sub-schema; "auto" picks chunked
+# once the document exceeds PARSER_SINGLE_PASS_MAX_TOKENS
+PARSER_MODE = os.getenv("PARSER_MODE", "auto")
+PARSER_SINGLE_PASS_MAX_TOKENS = int(os.getenv("PARSER_SINGLE_PASS_MAX_TOKENS", "24000"))
+PARSER_CHUNK_TOKENS = int(os.getenv("PARSER_CHUNK_TOKENS", "6000"))
+PARSER_CHUNK_OVERLAP_TOKENS = int(os.getenv("PARSER_CHUNK_OVERLAP_TOKENS", "200"))
+PARSER_PARTIAL_MAX_OUTPUT_TOKENS = int(os.getenv("PARSER_PARTIAL_MAX_OUTPUT_TOKENS", "2048"))
+PARSER_MAX_CONCURRENCY = int(os.getenv("PARSER_MAX_CONCURRENCY", "4"))
+PARSER_FIELD_MODEL = os.getenv("PARSER_FIELD_MODEL", "mistral-large-latest")
+PARSER_FIELD_CONTEXT_TOKENS = int(os.getenv("PARSER_FIELD_CONTEXT_TOKENS", "3000"))
+PARSER_FIELD_TIMEOUT_SECONDS = float(os.getenv("PARSER_FIELD_TIMEOUT_SECONDS", "30"))
+
+# Vector store backend: "pinecone" (managed) or "local" (in-process, persisted under LOCAL_VECTOR_DIR)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "policies")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", os.path.join(os.getcwd(), "temp", "vectors"))
+# Namespaces at or above this many vectors are searched through an IVF index instead of brute force
+LOCAL_VECTOR_IVF_THRESHOLD = int(os.getenv("LOCAL_VECTOR_IVF_THRESHOLD", "20000"))
+LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", "8"))
+# RAG indexing: chunks per embedding request, records per upsert request, and upsert requests in flight
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+VECTOR_UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_UPSERT_BATCH_SIZE", "100"))
+VECTOR_UPSERT_CONCURRENCY = int(os.getenv("VECTOR_UPSERT_CONCURRENCY", "4"))
+# In-process cache of policy documents read on the chat path
+POLICY_CACHE_TTL_SECONDS = float(os.getenv("POLICY_CACHE_TTL_SECONDS", "300"))
+POLICY_CACHE_MAX_ITEMS = int(os.getenv("POLICY_CACHE_MAX_ITEMS", "10000"))
+CHAT_RETRIEVAL_K = int(os.getenv("CHAT_RETRIEVAL_K", "5"))
+# Semantic answer cache for chat: near-duplicate questions about the same policy reuse the last answer
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+# Hybrid retrieval: per-policy BM25 indexes fused with dense results by reciprocal rank
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(os.getcwd(), "temp", "lexical"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Queries of at most this many terms, all present in the policy vocabulary, skip the embedding call
+LEXICAL_ONLY_MAX_TERMS = int(os.getenv("LEXICAL_ONLY_MAX_TERMS", "2"))
+# Answer single-field questions (co-pay, room rent, waiting periods...) from the stored PolicyDNA before RAG
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
@@ -1,16 +1,8 @@
-from dotenv import load_dotenv
-load_dotenv()
+from shared.utils.mongo import get_mongo_client
 
-from pymongo import MongoClient
-from services.policy_intelligence_service.core.config import MONGO_URI
-
-
-client = MongoClient(MONGO_URI)
-db = client.policy_intelligence
-user_db = client.user_db
 
 def get_db():
-    return db
+    return get_mongo_client().policy_intelligence
 
 def get_users_collection():
-    return user_db.users
+    return get_mongo_client().user_db.users
@@ -14,7 +14,7 @@ class RoomRentLimit(BaseModel):
     excludes_icu_and_pharmacy: bool
 
 class CoPay(BaseModel):
-    percentage: float
+    percentage: Optional[float]  # None when the co-pay terms could not be extracted
     is_entry_age_based: bool
     threshold_age: Optional[int]
     is_zone_based: bool
@@ -49,3 +49,4 @@ class PolicyDNA(BaseModel):
     plain_english_summary: str
     sum_insured: float = 0.0  # Added for simulation logic
     user_entry_age: int = 40  # Added for simulation logic
+    missing_fields: List[str] = []  # Fields the parser could not extract and filled with placeholders
@@ -0,0 +1,72 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Stages of the ingestion DAG and the stages each one waits for. Embedding only needs the text,
+# so it runs alongside parsing; persistence and vector upsert join once both branches are done.
+STAGE_DEPENDENCIES = {
+    "fingerprint": [],
+    "extract_text": ["fingerprint"],
+    "parse_dna": ["extract_text"],
+    "embed_chunks": ["extract_text"],
+    "analyze_risks": ["parse_dna"],
+    "persist": ["analyze_risks"],
+    "index_rag": ["parse_dna", "embed_chunks"],
+}
+INGESTION_STAGES = list(STAGE_DEPENDENCIES)
+
+class JobStage(BaseModel):
+    name: str
+    status: str = "pending"  # pending | running | completed | cached | failed | skipped
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+class IngestionJob(BaseModel):
+    job_id: str
+    user_id: str
+    filename: str
+    sum_insured: float
+    status: str = "queued"  # queued | running | completed | failed
+    stages: List[JobStage] = Field(default_factory=lambda: [JobStage(name=name) for name in INGESTION_STAGES])
+    policy_id: Optional[str] = None
+    cache_hit: Optional[str] = None  # "file" | "text" when parse results came from the dedup cache
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def stage(self, name: str) -> JobStage:
+        return next(s for s in self.stages if s.name == name)
+
+    def critical_path(self) -> List[str]:
+        """Walk back from the last stage to finish, always through the dependency that finished last."""
+        timed = {s.name: s for s in self.stages if s.finished_at}
+        if not timed:
+            return []
+        path = [max(timed.values(), key=lambda s: s.finished_at).name]
+        while True:
+            deps = [timed[d] for d in STAGE_DEPENDENCIES[path[-1]] if d in timed]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda s: s.finished_at).name)
+        return list(reversed(path))
+
+    @property
+    def progress(self) -> float:
+        done = sum(1 for s in self.stages if s.status in ("completed", "cached", "skipped", "failed"))
+        return round(done / len(self.stages), 2)
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    progress: float
+    stages: List[JobStage]
+    critical_path: List[str] = []
+    policy_id: Optional[str] = None
+    cache_hit: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
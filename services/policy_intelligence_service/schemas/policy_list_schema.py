@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+# Fields a client may request through ?fields=, in addition to _id
+LISTABLE_FIELDS = {
+    "policy_metadata", "room_rent_limit", "co_pay", "waiting_periods_months", "modern_treatments",
+    "risk_analysis", "notice_period", "non_payable_items", "plain_english_summary", "sum_insured",
+    "user_entry_age",
+}
+
+# Only what the policy list card renders; the heavy summary and risk lists stay in Mongo
+CARD_PROJECTION = {
+    "policy_metadata.insurer": 1,
+    "policy_metadata.policy_name": 1,
+    "policy_metadata.overall_security_score": 1,
+    "sum_insured": 1,
+    "co_pay.percentage": 1,
+    "room_rent_limit.limit_type": 1,
+}
+
+class PolicyCard(BaseModel):
+    id: str
+    insurer: Optional[str] = None
+    policy_name: Optional[str] = None
+    score: Optional[float] = None
+    sum_insured: Optional[float] = None
+    co_pay_percentage: Optional[float] = None
+    room_rent_type: Optional[str] = None
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "PolicyCard":
+        metadata = doc.get("policy_metadata", {})
+        return cls(
+            id=str(doc["_id"]),
+            insurer=metadata.get("insurer"),
+            policy_name=metadata.get("policy_name"),
+            score=metadata.get("overall_security_score"),
+            sum_insured=doc.get("sum_insured"),
+            co_pay_percentage=doc.get("co_pay", {}).get("percentage"),
+            room_rent_type=doc.get("room_rent_limit", {}).get("limit_type"),
+        )
+
+class PolicyPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
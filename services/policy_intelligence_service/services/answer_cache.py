@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from services.policy_intelligence_service.core.config import (
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES
+)
+
+# Answers are scoped to (namespace, document id); document None is a question across all of the user's policies.
+
+
+class _Scope:
+    def __init__(self):
+        self.vectors = np.zeros((0, 0), dtype=np.float32)  # L2-normalised query embeddings
+        self.entries: List[dict] = []
+
+
+_scopes: Dict[tuple, _Scope] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def _drop_expired(scope: _Scope, now: float):
+    keep = [i for i, entry in enumerate(scope.entries) if entry["expires_at"] > now]
+    if len(keep) != len(scope.entries):
+        scope.entries = [scope.entries[i] for i in keep]
+        scope.vectors = scope.vectors[keep]
+
+
+def lookup(namespace: str, document_id: Optional[str], query_vector: Optional[List[float]]) -> Optional[dict]:
+    """The cached answer whose question is most similar to this one, if it clears ANSWER_CACHE_SIMILARITY."""
+    if not ANSWER_CACHE_ENABLED or query_vector is None:
+        return None
+    with _lock:
+        scope = _scopes.get((namespace, document_id))
+        if scope is not None:
+            _drop_expired(scope, time.monotonic())
+        if scope is None or not scope.entries:
+            _stats["misses"] += 1
+            return None
+        scores = scope.vectors @ _unit(query_vector)
+        best = int(np.argmax(scores))
+        if scores[best] < ANSWER_CACHE_SIMILARITY:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        return {**scope.entries[best], "similarity": float(scores[best])}
+
+
+def store(namespace: str, document_id: Optional[str], query_vector: Optional[List[float]], query: str, answer: str,
+          chunks: List[dict]):
+    # Keyword queries answered without an embedding have no vector to key on
+    if not ANSWER_CACHE_ENABLED or not answer or query_vector is None:
+        return
+    vector = _unit(query_vector)
+    with _lock:
+        scope = _scopes.setdefault((namespace, document_id), _Scope())
+        _drop_expired(scope, time.monotonic())
+        if scope.vectors.size == 0:
+            scope.vectors = np.zeros((0, vector.shape[0]), dtype=np.float32)
+        scope.entries.append({
+            "query": query, "answer": answer, "chunks": chunks,
+            "expires_at": time.monotonic() + ANSWER_CACHE_TTL_SECONDS,
+        })
+        scope.vectors = np.vstack([scope.vectors, vector[None, :]])
+        if len(scope.entries) > ANSWER_CACHE_MAX_ENTRIES:
+            scope.entries = scope.entries[-ANSWER_CACHE_MAX_ENTRIES:]
+            scope.vectors = scope.vectors[-ANSWER_CACHE_MAX_ENTRIES:]
+        _stats["stores"] += 1
+
+
+def invalidate(namespace: str, document_id: Optional[str] = None):
+    """Forget answers about a re-indexed or deleted policy, plus the user's cross-policy answers."""
+    with _lock:
+        for key in [k for k in _scopes if k[0] == namespace and (document_id is None or k[1] in (document_id, None))]:
+            del _scopes[key]
+            _stats["invalidations"] += 1
+
+
+def answer_cache_stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "scopes": len(_scopes),
+            "entries": sum(len(scope.entries) for scope in _scopes.values()),
+        }
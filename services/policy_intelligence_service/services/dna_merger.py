@@ -0,0 +1,237 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Deterministic reducer for partial PolicyDNA extractions. Implements the conflict rules of the
+# parser system prompt: endorsements override the policy wording, which overrides the prospectus;
+# within the same source, the most restrictive interpretation wins and the conflict is documented.
+
+SOURCE_PRECEDENCE = {"ENDORSEMENT": 3, "POLICY_WORDING": 2, "UNKNOWN": 1, "PROSPECTUS": 0}
+
+# Higher = more restrictive for the customer
+ROOM_RENT_RESTRICTIVENESS = {"FLAT": 4, "PERCENTAGE": 3, "CATEGORY": 2, "NO_LIMIT": 0}
+
+CAPPED_LIMIT_TYPES = {"FLAT", "PERCENTAGE", "CATEGORY"}
+
+
+def _rank(partial: dict) -> int:
+    source = str(partial.get("source_type") or "UNKNOWN").upper()
+    return SOURCE_PRECEDENCE.get(source, SOURCE_PRECEDENCE["UNKNOWN"])
+
+
+def _slug(name: str) -> str:
+    return "".join(name.lower().split())
+
+
+def _amount(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"\d[\d,]*(?:\.\d+)?", value)
+        if match:
+            return float(match.group(0).replace(",", ""))
+    return None
+
+
+def _resolve(candidates: List[Tuple[int, Any]], restrictiveness: Callable[[Any], Any],
+             label: str, conflicts: List[str], describe: Callable[[Any], str] = str) -> Any:
+    """Pick the most restrictive value among the highest-precedence candidates."""
+    if not candidates:
+        return None
+    top_rank = max(rank for rank, _ in candidates)
+    top = [value for rank, value in candidates if rank == top_rank]
+    chosen = max(top, key=restrictiveness)
+    distinct = {describe(value) for _, value in candidates}
+    if len(distinct) > 1:
+        conflicts.append(f"Conflicting {label} across policy sections ({', '.join(sorted(distinct))}); "
+                         f"applied {describe(chosen)}.")
+    return chosen
+
+
+def _section(partial: dict, section: str) -> dict:
+    # The model sometimes returns a string or list where an object belongs; such a section says nothing
+    value = partial.get(section)
+    return value if isinstance(value, dict) else {}
+
+
+def _collect(partials: List[dict], section: str, field: str) -> List[Tuple[int, Any]]:
+    values = []
+    for partial in partials:
+        value = _section(partial, section).get(field)
+        if value is not None:
+            values.append((_rank(partial), value))
+    return values
+
+
+def _union(partials: List[dict], getter: Callable[[dict], Optional[list]]) -> List[str]:
+    seen, merged = set(), []
+    for partial in partials:
+        items = getter(partial)
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            key = str(item).strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(str(item).strip())
+    return merged
+
+
+def _treatment_restrictiveness(treatment: dict) -> Tuple[int, float]:
+    limit = str(treatment.get("limit") or "").strip()
+    if treatment.get("covered") is False or limit.lower() == "excluded":
+        return (3, 0.0)
+    amount = _amount(limit)
+    if amount is not None:
+        return (2, -amount)  # a lower cap is more restrictive
+    if limit.lower() == "up to sum insured":
+        return (0, 0.0)
+    if not limit or limit.lower() == "not mentioned":
+        return (-1, 0.0)  # carries no information; any real statement beats it
+    return (1, 0.0)
+
+
+def _room_rent_restrictiveness(limit: dict) -> Tuple[int, float]:
+    limit_type = str(limit["limit_type"]).upper()
+    if limit_type not in ("FLAT", "PERCENTAGE"):
+        return (ROOM_RENT_RESTRICTIVENESS[limit_type], 0.0)
+    amount = _amount(limit.get("value"))
+    # Between caps of the same kind the lower one is more restrictive; a cap without an amount ranks last
+    return (ROOM_RENT_RESTRICTIVENESS[limit_type], -amount if amount is not None else float("-inf"))
+
+
+def _merge_room_rent(partials: List[dict], conflicts: List[str]) -> dict:
+    records = [
+        (_rank(p), p["room_rent_limit"]) for p in partials
+        if isinstance(p.get("room_rent_limit"), dict)
+        and str(p["room_rent_limit"].get("limit_type") or "").upper() in ROOM_RENT_RESTRICTIVENESS
+    ]
+    chosen = _resolve(records, _room_rent_restrictiveness, "room rent limits", conflicts,
+                      lambda r: f"{str(r['limit_type']).upper()} {r.get('value') or ''}".strip())
+    if chosen is None:
+        chosen = {"limit_type": "NOT_MENTIONED", "value": None}
+    proportionate = _resolve(_collect(partials, "room_rent_limit", "proportionate_deduction"), bool,
+                             "proportionate deduction clauses", conflicts)
+    excludes_icu = _resolve(_collect(partials, "room_rent_limit", "excludes_icu_and_pharmacy"), lambda v: not v,
+                            "ICU/pharmacy treatment under room rent limits", conflicts)
+    return {
+        "limit_type": str(chosen["limit_type"]).upper(),
+        "value": chosen.get("value"),
+        "proportionate_deduction": bool(proportionate),
+        "excludes_icu_and_pharmacy": bool(excludes_icu),
+    }
+
+
+def _merge_co_pay(partials: List[dict], conflicts: List[str]) -> dict:
+    records = [
+        (_rank(p), p["co_pay"]) for p in partials
+        if isinstance(p.get("co_pay"), dict) and _amount(p["co_pay"].get("percentage")) is not None
+    ]
+    # A flat co-pay for everyone is more restrictive than one that only applies above an entry age
+    chosen = _resolve(records, lambda c: (_amount(c["percentage"]), not c.get("is_entry_age_based")),
+                      "co-payment terms", conflicts,
+                      lambda c: f"{_amount(c['percentage']):g}%" + (" above entry age" if c.get("is_entry_age_based") else ""))
+    zone_based = _resolve(_collect(partials, "co_pay", "is_zone_based"), bool, "zone-based co-pay", conflicts)
+    if not chosen:
+        return {"percentage": 0.0, "is_entry_age_based": False, "threshold_age": None, "is_zone_based": bool(zone_based)}
+    return {
+        "percentage": _amount(chosen["percentage"]),
+        "is_entry_age_based": bool(chosen.get("is_entry_age_based")),
+        "threshold_age": chosen.get("threshold_age"),
+        "is_zone_based": bool(zone_based),
+    }
+
+
+def _merge_max(partials: List[dict], section: str, fields: List[str], label: str, conflicts: List[str]) -> dict:
+    merged = {}
+    for field in fields:
+        candidates = [(rank, _amount(v)) for rank, v in _collect(partials, section, field) if _amount(v) is not None]
+        value = _resolve(candidates, lambda v: v, f"{label} ({field})", conflicts)
+        merged[field] = int(value) if value is not None else None
+    return merged
+
+
+def _merge_modern_treatments(partials: List[dict], conflicts: List[str]) -> Dict[str, dict]:
+    names: Dict[str, str] = {}
+    candidates: Dict[str, List[Tuple[int, dict]]] = {}
+    for partial in partials:
+        for name, treatment in _section(partial, "modern_treatments").items():
+            if not isinstance(treatment, dict):
+                continue
+            slug = _slug(name)
+            names.setdefault(slug, name)
+            candidates.setdefault(slug, []).append((_rank(partial), treatment))
+    merged = {}
+    for slug, records in candidates.items():
+        chosen = _resolve(records, _treatment_restrictiveness, f"cover for {names[slug]}", conflicts,
+                          lambda t: str(t.get("limit") or "Not mentioned") if t.get("covered") is not False else "Excluded")
+        merged[names[slug]] = {
+            "covered": bool(chosen.get("covered")),
+            "limit": str(chosen.get("limit") or "Not mentioned"),
+        }
+    return merged
+
+
+def _first(partials: List[dict], section: str, field: str) -> Optional[Any]:
+    # Highest-precedence source first, then document order
+    for partial in sorted(partials, key=_rank, reverse=True):
+        value = _section(partial, section).get(field)
+        if value not in (None, "", "unknown"):
+            return value
+    return None
+
+
+def compute_security_score(dna: dict) -> float:
+    """Apply the prompt's 0-100 scoring framework to a merged DNA; missing data is neutral."""
+    score = 50
+    room_rent = dna.get("room_rent_limit") or {}
+    limit_type = str(room_rent.get("limit_type") or "").upper()
+    if limit_type in CAPPED_LIMIT_TYPES:
+        score -= 20
+    elif limit_type == "NO_LIMIT":
+        score += 20
+    if room_rent.get("proportionate_deduction"):
+        score -= 10
+    if (_amount((dna.get("co_pay") or {}).get("percentage")) or 0) > 0:
+        score -= 15
+    treatments = (dna.get("modern_treatments") or {}).values()
+    risk_text = " ".join((dna.get("risk_analysis") or {}).get("hidden_clauses", []) +
+                         (dna.get("risk_analysis") or {}).get("negative_features", [])).lower()
+    if any(_treatment_restrictiveness(t)[0] == 2 for t in treatments) or "sub-limit" in risk_text:
+        score -= 10
+    if ((dna.get("waiting_periods_months") or {}).get("pre_existing_diseases") or 0) >= 36:
+        score -= 10
+    positives = " ".join((dna.get("risk_analysis") or {}).get("positive_features", [])).lower()
+    if "restoration" in positives and "related" in positives.replace("unrelated", ""):
+        score += 10
+    if "consumable" in positives:
+        score += 10
+    return float(max(0, min(100, score)))
+
+
+def merge_partial_dna(partials: List[dict]) -> dict:
+    """Reduce partial extractions (one per document section) into a single PolicyDNA dict."""
+    conflicts: List[str] = []
+    merged = {
+        "policy_metadata": {
+            "policy_id_uin": _first(partials, "policy_metadata", "policy_id_uin") or "unknown",
+            "insurer": _first(partials, "policy_metadata", "insurer") or "unknown",
+            "policy_name": _first(partials, "policy_metadata", "policy_name") or "unknown",
+        },
+        "room_rent_limit": _merge_room_rent(partials, conflicts),
+        "co_pay": _merge_co_pay(partials, conflicts),
+        "waiting_periods_months": _merge_max(partials, "waiting_periods_months",
+                                             ["initial", "specific_illnesses", "pre_existing_diseases"],
+                                             "waiting periods", conflicts),
+        "modern_treatments": _merge_modern_treatments(partials, conflicts),
+        "notice_period": _merge_max(partials, "notice_period", ["planned_hours", "emergency_hours"],
+                                    "notice periods", conflicts),
+        "non_payable_items": _union(partials, lambda p: p.get("non_payable_items")),
+        "risk_analysis": {
+            "hidden_clauses": _union(partials, lambda p: _section(p, "risk_analysis").get("hidden_clauses")),
+            "negative_features": _union(partials, lambda p: _section(p, "risk_analysis").get("negative_features")),
+            "positive_features": _union(partials, lambda p: _section(p, "risk_analysis").get("positive_features")),
+        },
+    }
+    merged["risk_analysis"]["hidden_clauses"].extend(conflicts)
+    merged["policy_metadata"]["overall_security_score"] = compute_security_score(merged)
+    return merged
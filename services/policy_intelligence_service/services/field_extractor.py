@@ -0,0 +1,126 @@
+import re
+from typing import Dict, List
+
+# Field-parallel extraction: each PolicyDNA sub-schema gets its own small prompt, run only over the
+# document passages that mention that field's section keywords (the same keywords the full system
+# prompt tells the model to search for).
+
+FIELD_PREAMBLE = """
+You extract ONE part of a health insurance policy's structured profile from the passages below.
+Use only what the passages state. If something is not mentioned, use null.
+Return STRICT JSON with exactly this shape and no extra text:
+{schema}
+
+{instructions}
+"""
+
+FIELD_SPECS: Dict[str, dict] = {
+    "policy_metadata": {
+        "keywords": ["UIN", "Unique Identification", "Policy Name", "Product Name", "Insurance Company", "Limited"],
+        "schema": '{"policy_id_uin": "string", "insurer": "string", "policy_name": "string"}',
+        "instructions": "The UIN is the IRDAI Unique Identification Number of the product.",
+        "include_head": True,
+    },
+    "room_rent_limit": {
+        "keywords": ["In-patient Hospitalization", "Eligibility", "Accommodation", "Room Rent",
+                     "Associated Medical Expenses", "Proportionate Deduction"],
+        "schema": '{"limit_type": "CATEGORY|PERCENTAGE|FLAT|NO_LIMIT|NOT_MENTIONED", "value": "string", '
+                  '"proportionate_deduction": boolean, "excludes_icu_and_pharmacy": boolean}',
+        "instructions": "Identify room category limits (category / percentage / flat / no limit). If a higher "
+                        "room leads to pro-rata reduction of doctor, surgery or hospital charges, set "
+                        "proportionate_deduction to true.",
+    },
+    "co_pay": {
+        "keywords": ["Co-payment", "Co-pay", "Copayment", "Copay"],
+        "schema": '{"percentage": number, "is_entry_age_based": boolean, "threshold_age": number, '
+                  '"is_zone_based": boolean}',
+        "instructions": "Extract only mandatory co-payments; ignore voluntary deductibles and optional co-pay "
+                        "discounts. If co-pay is not mandatory, return 0 and mark flags as false.",
+    },
+    "waiting_periods_months": {
+        "keywords": ["Waiting Period", "Pre-Existing", "Pre-existing Disease", "Specific Illness",
+                     "Named Illness", "Specified Disease"],
+        "schema": '{"initial": number, "specific_illnesses": number, "pre_existing_diseases": number}',
+        "instructions": "Report the Initial, Specific / Named Illness and Pre-Existing Disease (PED) waiting "
+                        "periods in months.",
+    },
+    "modern_treatments": {
+        "keywords": ["Modern Treatment", "Advanced Treatment", "Robotic", "Stem Cell", "Oral Chemotherapy",
+                     "Immunotherapy"],
+        "schema": '{"treatment_name": {"covered": boolean, "limit": "Up to Sum Insured | Flat Amount | '
+                  'Not mentioned | Excluded"}}',
+        "instructions": "Cover robotic surgery, stem cell therapy, oral chemotherapy, immunotherapy and any other "
+                        "listed modern treatment. Distinguish covered up to Sum Insured, covered with a sub-limit "
+                        "(give the amount), explicitly excluded, and not mentioned.",
+    },
+    "notice_period": {
+        "keywords": ["Notice", "Intimation", "Planned Hospitalization", "Emergency Hospitalization",
+                     "Pre-authorization", "Cashless"],
+        "schema": '{"planned_hours": number, "emergency_hours": number}',
+        "instructions": "Report how many hours in advance the insurer or TPA must be informed for planned and "
+                        "for emergency hospitalisation.",
+    },
+    "non_payable_items": {
+        "keywords": ["Non-Payable", "Non Payable", "Non-Medical", "Non Medical", "Consumables", "List I",
+                     "Items not payable"],
+        "schema": '["item"]',
+        "instructions": "List only items explicitly listed in the document as not payable.",
+    },
+    "risk_analysis": {
+        "keywords": ["Sub-limit", "Sublimit", "Restoration", "Reinstatement", "Exclusion", "Cataract",
+                     "Joint Replacement", "Hernia", "Tonsil"],
+        "schema": '{"hidden_clauses": ["string"], "negative_features": ["string"], "positive_features": ["string"]}',
+        "instructions": "Audit the wording for anti-customer patterns: disease-wise or procedure-wise sub-limits "
+                        "(cataract, joint replacement, hernia, ENT / tonsils), and restoration rules (only after "
+                        "full exhaustion, related vs unrelated illnesses). Quote restrictive wording in "
+                        "hidden_clauses.",
+    },
+    "plain_english_summary": {
+        "keywords": ["Key Features", "Benefits", "Coverage", "Sum Insured", "What is covered"],
+        "schema": '{"plain_english_summary": "string"}',
+        "instructions": "Write a 10-15 sentence summary for a first-time insurance buyer. Explain like a helpful, "
+                        "informed peer and avoid jargon such as \"Incurred\", \"Inception\" or \"Indemnity\".",
+        "include_head": True,
+    },
+}
+
+
+def build_field_prompt(field: str) -> str:
+    spec = FIELD_SPECS[field]
+    return FIELD_PREAMBLE.format(schema=spec["schema"], instructions=spec["instructions"])
+
+
+def _passages(raw_text: str, passage_chars: int) -> List[str]:
+    # Paragraph-ish passages; long paragraphs are cut so one wall of text can't eat the budget
+    passages = []
+    for block in re.split(r"\n\s*\n", raw_text):
+        block = block.strip()
+        for start in range(0, len(block), passage_chars):
+            passages.append(block[start:start + passage_chars])
+    return [p for p in passages if p]
+
+
+def select_sections(raw_text: str, field: str, budget_chars: int, passage_chars: int = 1500) -> str:
+    """Return the passages most relevant to a field, in document order, within a character budget."""
+    spec = FIELD_SPECS[field]
+    patterns = [re.compile(re.escape(keyword), re.IGNORECASE) for keyword in spec["keywords"]]
+    passages = _passages(raw_text, passage_chars)
+
+    scored = []
+    for index, passage in enumerate(passages):
+        hits = sum(len(pattern.findall(passage)) for pattern in patterns)
+        if hits:
+            scored.append((hits, index))
+    chosen = set()
+    if spec.get("include_head"):
+        chosen.update(range(min(2, len(passages))))
+    used = sum(len(passages[i]) for i in chosen)
+    for hits, index in sorted(scored, key=lambda item: (-item[0], item[1])):
+        # Take the matching passage plus the one after it, where clause bodies usually continue
+        for i in (index, index + 1):
+            if i < len(passages) and i not in chosen and used + len(passages[i]) <= budget_chars:
+                chosen.add(i)
+                used += len(passages[i])
+    if not chosen:
+        return raw_text[:budget_chars]
+    return "\n\n".join(passages[i] for i in sorted(chosen))
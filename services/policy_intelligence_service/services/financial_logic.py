@@ -87,7 +87,7 @@ def simulate_payout(policy_dna: dict, hospital_bill: list, stay_context: dict):
     # Co-pay Logic
     cp_cfg = policy_dna.get("co_pay", {})
     user_entry_age = policy_dna.get("user_entry_age", 40)
-    effective_cp_pct = cp_cfg.get("percentage", 0) / 100
+    effective_cp_pct = (cp_cfg.get("percentage") or 0) / 100
     
     if cp_cfg.get("is_entry_age_based") and user_entry_age < cp_cfg.get("threshold_age", 61):
         effective_cp_pct = 0.0
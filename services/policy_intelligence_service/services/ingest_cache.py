@@ -0,0 +1,108 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from typing import List, Optional
+from services.policy_intelligence_service.db.session import get_db
+from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
+
+# Content-addressed cache of parse results, shared by every user who uploads the same document.
+# Entries hold the user-independent PolicyDNA, the derived risks and the ids of the indexed vectors.
+CACHE_COLLECTION = "ingestion_cache"
+
+# Per-user fields never stored in (or served from) the cache
+PER_USER_FIELDS = {"sum_insured", "user_entry_age", "user_id"}
+
+_stats = {"file_hits": 0, "text_hits": 0, "misses": 0}
+
+
+def normalize_text(text: str) -> str:
+    # Same wording with different whitespace, ligatures or casing hashes identically
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _collection():
+    return get_db()[CACHE_COLLECTION]
+
+
+async def lookup_file(file_hash: str) -> Optional[dict]:
+    entry = await _collection().find_one_and_update({"file_hashes": file_hash}, {"$inc": {"hits": 1}})
+    if entry:
+        _stats["file_hits"] += 1
+    return entry
+
+
+async def lookup_text(text_hash: str, file_hash: Optional[str] = None) -> Optional[dict]:
+    update = {"$inc": {"hits": 1}}
+    if file_hash:
+        # Remember this byte-level variant so the next upload skips extraction too
+        update["$addToSet"] = {"file_hashes": file_hash}
+    entry = await _collection().find_one_and_update({"text_hash": text_hash}, update)
+    if entry:
+        _stats["text_hits"] += 1
+    else:
+        _stats["misses"] += 1
+    return entry
+
+
+def is_cacheable(parsed: PolicyDNA) -> bool:
+    # Never pin the parser's "unknown" fallback DNA, or one with placeholder fields, for every
+    # future upload of this document
+    return parsed.policy_metadata.insurer != "unknown" and not parsed.missing_fields
+
+
+async def store(file_hash: str, text_hash: str, parsed: PolicyDNA, risks: List[str],
+          vector_ids: Optional[List[str]], vector_namespace: Optional[str]):
+    await _collection().update_one(
+        {"text_hash": text_hash},
+        {
+            "$set": {
+                "dna": parsed.model_dump(exclude=PER_USER_FIELDS),
+                "risks": risks,
+                "vector_ids": vector_ids,
+                "vector_namespace": vector_namespace,
+                "policy_id_uin": parsed.policy_metadata.policy_id_uin,
+                "updated_at": datetime.utcnow(),
+            },
+            "$addToSet": {"file_hashes": file_hash},
+            "$setOnInsert": {"created_at": datetime.utcnow(), "hits": 0},
+        },
+        upsert=True,
+    )
+
+
+async def update_vectors(text_hash: str, vector_ids: List[str], vector_namespace: str):
+    await _collection().update_one(
+        {"text_hash": text_hash},
+        {"$set": {"vector_ids": vector_ids, "vector_namespace": vector_namespace, "updated_at": datetime.utcnow()}},
+    )
+
+
+async def clear_vectors(text_hash: str):
+    # The cached vectors are gone from their namespace; the next upload re-embeds instead of copying
+    await _collection().update_one(
+        {"text_hash": text_hash},
+        {"$set": {"vector_ids": None, "vector_namespace": None, "updated_at": datetime.utcnow()}},
+    )
+
+
+async def add_risks(text_hash: str, risks: List[str]):
+    # LLM-found risks, so later uploads of the document are served the enriched list
+    await _collection().update_one(
+        {"text_hash": text_hash},
+        {
+            "$addToSet": {"risks": {"$each": risks}, "dna.risk_analysis.negative_features": {"$each": risks}},
+            "$set": {"updated_at": datetime.utcnow()},
+        },
+    )
+
+
+def cache_stats() -> dict:
+    hits = _stats["file_hits"] + _stats["text_hits"]
+    lookups = hits + _stats["misses"]
+    return {**_stats, "hits": hits, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
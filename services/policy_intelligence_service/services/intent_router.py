@@ -0,0 +1,152 @@
+import re
+from typing import Callable, List, Optional, Tuple
+from pydantic import ValidationError
+from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
+from services.policy_intelligence_service.services.lexical_index import tokenize
+
+# Questions that ask for reasoning, comparison or a calculation rather than a stored value go to RAG
+OPEN_ENDED = re.compile(
+    r"\b(why|explain|compare|comparison|difference|versus|vs|example|calculate|scenario|suppose|if i|what if|"
+    r"should i (buy|choose|take|switch)|better|recommend)\b"
+)
+
+# Words that can accompany a field question without changing what is asked. Anything else left over
+# ("waiting period for cataract") names something more specific than the stored field, so RAG answers.
+FILLER = {
+    "about", "advance", "amount", "any", "applicable", "applies", "apply", "before", "charges", "claim", "claims",
+    "days", "details", "disease", "diseases", "emergency", "get", "has", "have", "hospital", "hospitalisation",
+    "hospitalization", "hour", "hours", "illness", "illnesses", "insurer", "item", "items", "know", "limit",
+    "limits", "list", "long", "many", "month", "months", "need", "paid", "pay", "percent", "percentage", "period",
+    "periods", "plan", "planned", "please", "required", "tell", "there", "time",
+}
+
+
+def _fmt(value) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def _number(value) -> Optional[float]:
+    # Only bare numbers ("1", "5000", 5000.0); values such as "1% of SI" or "Rs. 5,000" are shown as written
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _room_rent(dna: PolicyDNA) -> Optional[str]:
+    room = dna.room_rent_limit
+    limit_type = room.limit_type.upper()
+    amount = _number(room.value)
+    if limit_type == "NO_LIMIT":
+        answer = "There is no room rent limit on this policy."
+    elif limit_type == "NOT_MENTIONED" or room.value in (None, "", "unknown"):
+        return None
+    elif limit_type == "PERCENTAGE" and amount is not None:
+        answer = f"Room rent is capped at {_fmt(amount)}% of the sum insured per day."
+    elif limit_type == "FLAT" and amount is not None:
+        answer = f"Room rent is capped at ₹{_fmt(amount)} per day."
+    elif limit_type == "CATEGORY":
+        answer = f"Room rent is limited to the {room.value} room category."
+    else:
+        answer = f"Room rent is capped at {str(room.value).strip()}."
+    if room.proportionate_deduction:
+        answer += " Choosing a costlier room triggers proportionate deduction on the rest of the bill"
+        answer += (" (ICU and pharmacy charges are exempt)." if room.excludes_icu_and_pharmacy
+                   else ", including ICU and pharmacy charges.")
+    return answer
+
+
+def _co_pay(dna: PolicyDNA) -> Optional[str]:
+    co_pay = dna.co_pay
+    if co_pay.percentage is None:
+        return None
+    if co_pay.percentage <= 0:
+        answer = "This policy has no mandatory co-payment."
+    elif co_pay.is_entry_age_based and co_pay.threshold_age:
+        answer = (f"A {co_pay.percentage:g}% co-payment applies to members who entered the policy at age "
+                  f"{co_pay.threshold_age} or above.")
+    else:
+        answer = f"A {co_pay.percentage:g}% co-payment applies to every claim."
+    if co_pay.is_zone_based:
+        answer += " An additional zone-based co-payment applies if you are treated in a higher-cost zone."
+    return answer
+
+
+def _waiting_periods(dna: PolicyDNA) -> Optional[str]:
+    waiting = dna.waiting_periods_months
+    parts = [
+        f"{label}: {months} months"
+        for label, months in (
+            ("Initial waiting period", waiting.initial),
+            ("Specific illnesses", waiting.specific_illnesses),
+            ("Pre-existing diseases", waiting.pre_existing_diseases),
+        )
+        if months is not None
+    ]
+    return "Waiting periods on this policy — " + "; ".join(parts) + "." if parts else None
+
+
+def _notice_period(dna: PolicyDNA) -> Optional[str]:
+    planned = dna.notice_period.planned_hours
+    emergency = dna.notice_period.emergency_hours
+    if not planned and not emergency:
+        return None
+    parts = []
+    if planned:
+        parts.append(f"planned hospitalisation must be intimated at least {planned} hours in advance")
+    if emergency:
+        parts.append(f"emergency hospitalisation must be intimated within {emergency} hours of admission")
+    return " and ".join(parts).capitalize() + "."
+
+
+def _non_payables(dna: PolicyDNA) -> Optional[str]:
+    items = dna.non_payable_items
+    if not items:
+        return None
+    return f"The policy lists {len(items)} non-payable item(s) that you pay yourself: {', '.join(items)}."
+
+
+# (intent, question pattern, answer template); a template returns None when the DNA lacks the value
+INTENTS: List[Tuple[str, re.Pattern, Callable[[PolicyDNA], Optional[str]]]] = [
+    ("room_rent",
+     re.compile(r"\broom[- ]?rent\b|\broom (limit|category|type|eligibility)\b|\bproportionate deduction\b"),
+     _room_rent),
+    ("co_pay", re.compile(r"\bco-?pay(ment)?s?\b"), _co_pay),
+    ("waiting_periods",
+     re.compile(r"\bwaiting( period)?s?\b|\bpre-?existing\b|\bped\b|\bspecific (illness|disease)"),
+     _waiting_periods),
+    ("notice_period", re.compile(r"\bnotice\b|\bintimat(e|ion)\b|\binform (the )?insurer\b"), _notice_period),
+    ("non_payable_items", re.compile(r"\bnon-?payables?\b|\bnot payable\b|\bconsumables\b"), _non_payables),
+]
+
+
+def route(query: str, policy: dict) -> Optional[dict]:
+    """Answer straight from the stored PolicyDNA when the question maps to exactly one known field.
+
+    Returns None (fall back to RAG) for open-ended or multi-topic questions, and for policies
+    whose DNA is a parsing fallback or lacks the asked-for value.
+    """
+    text = query.lower()
+    if OPEN_ENDED.search(text):
+        return None
+    matched = [(intent, template) for intent, pattern, template in INTENTS if pattern.search(text)]
+    if len(matched) != 1:
+        return None
+    try:
+        dna = PolicyDNA.model_validate(policy)
+    except ValidationError:
+        return None
+    if dna.policy_metadata.insurer == "unknown":
+        return None
+    intent, template = matched[0]
+    residual = text
+    for _, pattern, _ in INTENTS:
+        residual = pattern.sub(" ", residual)
+    if any(token not in FILLER for token in tokenize(residual)):
+        return None
+    answer = template(dna)
+    if not answer:
+        return None
+    return {"intent": intent, "answer": answer}
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services.policy_intelligence_service.core.config import LEXICAL_INDEX_DIR
+
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+MEMORY_ITEMS = 2048
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "if", "in",
+    "is", "it", "me", "much", "my", "of", "on", "or", "the", "this", "to", "under", "what", "when", "which",
+    "will", "with", "you", "your", "policy", "covered", "cover", "coverage",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 inverted index over one policy's chunks.
+
+    Chunk ids, pages and text are kept with the postings so lexical hits can be turned into
+    documents without touching the vector store.
+    """
+
+    def __init__(self, policy_id: str, ids: List[str], pages: List[Optional[int]], texts: List[str]):
+        self.policy_id = policy_id
+        self.ids = ids
+        self.pages = pages
+        self.texts = texts
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc, tf))
+        n = len(texts)
+        avgdl = (sum(lengths) / n) if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+        # Per-document length normalisation, precomputed so a query is only dictionary lookups
+        self.norms = [K1 * (1 - B + B * length / avgdl) if avgdl else K1 for length in lengths]
+
+    def covers(self, terms: List[str]) -> bool:
+        return bool(terms) and all(term in self.postings for term in terms)
+
+    def search(self, terms: List[str], k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + self.norms[doc])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def match(self, doc: int, score: float) -> dict:
+        return {
+            "id": self.ids[doc], "score": score,
+            "metadata": {"policy_id": self.policy_id, "page": self.pages[doc], "chunk": doc, "text": self.texts[doc]},
+        }
+
+    def to_dict(self) -> dict:
+        return {"policy_id": self.policy_id, "ids": self.ids, "pages": self.pages, "texts": self.texts}
+
+
+# Indexes by file path, most recently used last
+_memory: "OrderedDict[str, LexicalIndex]" = OrderedDict()
+# Namespace -> (directory mtime, index paths); the directory is only relisted when it changes
+_listings: Dict[str, Tuple[int, List[str]]] = {}
+_lock = threading.Lock()
+
+
+def _path(namespace: str, policy_id: str) -> str:
+    name = hashlib.sha256(policy_id.encode("utf-8")).hexdigest()[:24]
+    return os.path.join(LEXICAL_INDEX_DIR, namespace, f"{name}.json")
+
+
+def _remember(path: str, index: LexicalIndex):
+    _memory[path] = index
+    _memory.move_to_end(path)
+    while len(_memory) > MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+
+def build_index(namespace: str, policy_id: str, records: List[dict]) -> LexicalIndex:
+    """Build and persist a policy's index from its vector records (text and page come from metadata)."""
+    records = sorted(records, key=lambda r: r["metadata"].get("chunk", 0))
+    index = LexicalIndex(
+        policy_id,
+        [r["id"] for r in records],
+        [r["metadata"].get("page") for r in records],
+        [r["metadata"].get("text", "") for r in records],
+    )
+    path = _path(namespace, policy_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(index.to_dict(), f)
+    os.replace(f"{path}.tmp", path)
+    with _lock:
+        _remember(path, index)
+        _listings.pop(namespace, None)
+    return index
+
+
+def _load(path: str) -> Optional[LexicalIndex]:
+    with _lock:
+        index = _memory.get(path)
+        if index is not None:
+            _memory.move_to_end(path)
+            return index
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    index = LexicalIndex(data["policy_id"], data["ids"], data["pages"], data["texts"])
+    with _lock:
+        _remember(path, index)
+    return index
+
+
+def _namespace_paths(namespace: str) -> List[str]:
+    directory = os.path.join(LEXICAL_INDEX_DIR, namespace)
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _lock:
+        listing = _listings.get(namespace)
+    if listing is None or listing[0] != mtime:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+        listing = (mtime, [os.path.join(directory, name) for name in names])
+        with _lock:
+            _listings[namespace] = listing
+    return listing[1]
+
+
+def get_indexes(namespace: str, policy_id: Optional[str] = None) -> List[LexicalIndex]:
+    """Indexes for one policy, or for every policy in the namespace when policy_id is None.
+
+    Does file I/O on a cold cache, so async callers run it in a thread and pass the result on.
+    """
+    paths = [_path(namespace, policy_id)] if policy_id is not None else _namespace_paths(namespace)
+    return [index for index in map(_load, paths) if index is not None]
+
+
+def search(indexes: List[LexicalIndex], query: str, k: int) -> List[dict]:
+    terms = tokenize(query)
+    hits = [index.match(doc, score) for index in indexes for doc, score in index.search(terms, k)]
+    return sorted(hits, key=lambda hit: hit["score"], reverse=True)[:k]
+
+
+def is_lexical_query(indexes: List[LexicalIndex], query: str, max_terms: int) -> bool:
+    """Short keyword queries ("ICU", "cataract limit") whose terms all occur in the policy text."""
+    terms = tokenize(query)
+    if not terms or len(terms) > max_terms:
+        return False
+    return any(index.covers(terms) for index in indexes)
+
+
+def drop_index(namespace: str, policy_id: str):
+    path = _path(namespace, policy_id)
+    with _lock:
+        _memory.pop(path, None)
+        _listings.pop(namespace, None)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def reciprocal_rank_fusion(result_lists: List[List[dict]], k: int, rrf_k: int) -> List[dict]:
+    """Fuse ranked match lists by summing 1 / (rrf_k + rank); the first occurrence supplies metadata."""
+    fused: Dict[str, dict] = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            entry = fused.setdefault(match["id"], {**match, "score": 0.0})
+            entry["score"] += 1.0 / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)[:k]
@@ -1,9 +1,73 @@
+import asyncio
+import copy
 import json
 import logging
 import re
-from langchain_mistralai import ChatMistralAI
-from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
-from services.policy_intelligence_service.core.config import API_KEY
+from typing import Dict, List, Optional
+from pydantic import BaseModel, TypeAdapter
+from shared.utils.llm_registry import get_llm_registry
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from services.policy_intelligence_service.schemas.dna_schema import (
+    PolicyDNA, RoomRentLimit, CoPay, WaitingPeriodsMonths, ModernTreatment, RiskAnalysis, NoticePeriod
+)
+from services.policy_intelligence_service.services.dna_merger import merge_partial_dna, compute_security_score
+from services.policy_intelligence_service.services.field_extractor import FIELD_SPECS, build_field_prompt, select_sections
+from services.policy_intelligence_service.core.config import (
+    PARSER_MODE, PARSER_SINGLE_PASS_MAX_TOKENS, PARSER_CHUNK_TOKENS, PARSER_CHUNK_OVERLAP_TOKENS,
+    PARSER_PARTIAL_MAX_OUTPUT_TOKENS, PARSER_MAX_CONCURRENCY, PARSER_FIELD_MODEL, PARSER_FIELD_CONTEXT_TOKENS,
+    PARSER_FIELD_TIMEOUT_SECONDS
+)
+
+CHARS_PER_TOKEN = 4  # rough estimate for English policy wordings
+
+class _MetadataFields(BaseModel):
+    policy_id_uin: Optional[str] = None
+    insurer: str = "unknown"
+    policy_name: str = "unknown"
+
+# Validates each fan-out field on its own, so one bad field falls back without discarding the rest
+FIELD_VALIDATORS = {
+    "policy_metadata": TypeAdapter(_MetadataFields),
+    "room_rent_limit": TypeAdapter(RoomRentLimit),
+    "co_pay": TypeAdapter(CoPay),
+    "waiting_periods_months": TypeAdapter(WaitingPeriodsMonths),
+    "modern_treatments": TypeAdapter(Dict[str, ModernTreatment]),
+    "notice_period": TypeAdapter(NoticePeriod),
+    "non_payable_items": TypeAdapter(List[str]),
+    "risk_analysis": TypeAdapter(RiskAnalysis),
+    "plain_english_summary": TypeAdapter(str),
+}
+
+# What a field holds when its extraction fails or times out: "unknown", or the cautious reading where
+# a value is required, never the favourable one (no co-pay, no proportionate deduction, no room limit)
+MISSING_FIELD_DEFAULTS = {
+    "policy_metadata": {"policy_id_uin": None, "insurer": "unknown", "policy_name": "unknown"},
+    "room_rent_limit": {"limit_type": "NOT_MENTIONED", "value": None, "proportionate_deduction": True,
+                        "excludes_icu_and_pharmacy": False},
+    "co_pay": {"percentage": None, "is_entry_age_based": False, "threshold_age": None, "is_zone_based": False},
+    "waiting_periods_months": {"initial": None, "specific_illnesses": None, "pre_existing_diseases": None},
+    "modern_treatments": {},
+    "notice_period": {"planned_hours": None, "emergency_hours": None},
+    "non_payable_items": [],
+    "risk_analysis": {"hidden_clauses": [], "negative_features": [], "positive_features": []},
+    "plain_english_summary": "Summary unavailable; see the extracted policy details.",
+}
+
+PARTIAL_EXTRACTION_RULES = """
+
+        SECTION MODE (OVERRIDES THE OUTPUT RULES ABOVE)
+
+        You are reading ONE SECTION of a longer document, not the whole document.
+
+        Report only what this section states. Use null for any field, and omit any object, that this
+        section does not mention. Never fill in defaults such as 0, false or "NOT_MENTIONED".
+
+        Add a top-level "source_type": "ENDORSEMENT" | "POLICY_WORDING" | "PROSPECTUS" | "UNKNOWN"
+        describing the kind of document this section belongs to.
+
+        Set "overall_security_score" and "plain_english_summary" to null; they are computed after all
+        sections are merged.
+        """
 
 class PolicyParser:
     def __init__(self):
@@ -216,64 +280,180 @@ class PolicyParser:
         }
         """
 
-    async def parse_text_to_dna(self, raw_text: str) -> PolicyDNA:
+    async def parse_text_to_dna(self, raw_text: str, mode: Optional[str] = None) -> PolicyDNA:
+        mode = mode or PARSER_MODE
+        if mode == "auto":
+            mode = "chunked" if estimate_tokens(raw_text) > PARSER_SINGLE_PASS_MAX_TOKENS else "single"
+        if mode == "chunked":
+            return await self._parse_chunked(raw_text)
+        if mode == "fields":
+            return await self._parse_fields(raw_text)
+        return await self._parse_single(raw_text)
+
+    async def _parse_single(self, raw_text: str) -> PolicyDNA:
         logging.debug(f"Parsing text: {raw_text[:200]}...")  # Log first 200 chars of input
-        llm = ChatMistralAI(api_key=API_KEY, model="mistral-large-latest")
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": raw_text}
         ]
-        response = await llm.ainvoke(messages)
+        response = await get_llm_registry().ainvoke("mistral-large-latest", messages)
         print(f"LLM response: {response}")
         logging.debug(f"LLM response: {response.content}")
-        # Strip markdown code block if present
-        json_match = re.search(r'```json\s*(.*?)\s*```', response.content, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1).strip()
-        else:
-            json_str = response.content.strip()
+        json_str = _extract_json(response.content)
         logging.debug(f"Extracted JSON: {json_str}")
-        # Clean the JSON string by removing control characters
-        json_str = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_str)
         try:
             return PolicyDNA.model_validate_json(json_str)
         except Exception as e:
             logging.error(f"JSON parsing failed: {e}")
             # Fallback if JSON parsing fails
-            return PolicyDNA(
-                policy_metadata={
-                    "policy_id_uin": "unknown",
-                    "insurer": "unknown",
-                    "policy_name": "unknown",
-                    "overall_security_score": 50
-                },
-                room_rent_limit={
-                    "limit_type": "NO_LIMIT",
-                    "value": "unknown",
-                    "proportionate_deduction": False,
-                    "excludes_icu_and_pharmacy": False
-                },
-                co_pay={
-                    "percentage": 0.0,
-                    "is_entry_age_based": False,
-                    "threshold_age": None,
-                    "is_zone_based": False
-                },
-                waiting_periods_months={
-                    "initial": None,
-                    "specific_illnesses": None,
-                    "pre_existing_diseases": None
-                },
-                modern_treatments={},
-                risk_analysis={
-                    "hidden_clauses": [],
-                    "negative_features": [],
-                    "positive_features": []
-                },
-                notice_period={
-                    "planned_hours": 0,
-                    "emergency_hours": 0
-                },
-                non_payable_items=[],
-                plain_english_summary="Unable to generate summary due to parsing error."
-            )
+            return fallback_dna()
+
+    async def _parse_chunked(self, raw_text: str) -> PolicyDNA:
+        """Map-reduce: extract partial DNA per section concurrently, then merge deterministically."""
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=PARSER_CHUNK_TOKENS * CHARS_PER_TOKEN,
+            chunk_overlap=PARSER_CHUNK_OVERLAP_TOKENS * CHARS_PER_TOKEN
+        )
+        sections = splitter.split_text(raw_text)
+        logging.debug(f"Chunked parse over {len(sections)} sections")
+        registry = get_llm_registry()
+        semaphore = asyncio.Semaphore(PARSER_MAX_CONCURRENCY)
+
+        async def extract(index: int, section: str) -> Optional[dict]:
+            messages = [
+                {"role": "system", "content": self.system_prompt + PARTIAL_EXTRACTION_RULES},
+                {"role": "user", "content": f"SECTION {index + 1} OF {len(sections)}\n\n{section}"}
+            ]
+            async with semaphore:
+                response = await registry.ainvoke("mistral-large-latest", messages, max_tokens=PARSER_PARTIAL_MAX_OUTPUT_TOKENS)
+            try:
+                partial = json.loads(_extract_json(response.content))
+            except json.JSONDecodeError as e:
+                logging.error(f"Partial JSON parsing failed for section {index + 1}: {e}")
+                return None
+            return partial if isinstance(partial, dict) else None
+
+        results = await asyncio.gather(*(extract(i, section) for i, section in enumerate(sections)), return_exceptions=True)
+        partials = [r for r in results if isinstance(r, dict)]
+        for r in results:
+            if isinstance(r, Exception):
+                logging.error(f"Section extraction failed: {r}")
+        if not partials:
+            return fallback_dna()
+
+        try:
+            merged = merge_partial_dna(partials)
+        except Exception as e:
+            logging.error(f"Partial DNA merge failed: {e}")
+            return fallback_dna()
+        merged["plain_english_summary"] = await self._summarize(merged)
+        try:
+            return PolicyDNA.model_validate(merged)
+        except Exception as e:
+            logging.error(f"Merged DNA validation failed: {e}")
+            return fallback_dna()
+
+    async def _parse_fields(self, raw_text: str) -> PolicyDNA:
+        """Fan out one small prompt per sub-schema; latency is the slowest field, not the sum."""
+        registry = get_llm_registry()
+        budget_chars = PARSER_FIELD_CONTEXT_TOKENS * CHARS_PER_TOKEN
+
+        async def extract(field: str):
+            messages = [
+                {"role": "system", "content": build_field_prompt(field)},
+                {"role": "user", "content": select_sections(raw_text, field, budget_chars)}
+            ]
+            response = await asyncio.wait_for(registry.ainvoke(PARSER_FIELD_MODEL, messages), timeout=PARSER_FIELD_TIMEOUT_SECONDS)
+            value = json.loads(_extract_json(response.content))
+            if field == "plain_english_summary" and isinstance(value, dict):
+                value = value.get("plain_english_summary")
+            return FIELD_VALIDATORS[field].validate_python(value)
+
+        fields = list(FIELD_SPECS)
+        results = await asyncio.gather(*(extract(field) for field in fields), return_exceptions=True)
+        dna = {"missing_fields": []}
+        for field, result in zip(fields, results):
+            if isinstance(result, Exception):
+                # One slow or malformed field degrades to its default instead of failing the parse;
+                # missing_fields keeps the DNA out of the ingestion cache
+                logging.error(f"Field extraction failed for {field}: {result!r}")
+                dna[field] = copy.deepcopy(MISSING_FIELD_DEFAULTS[field])
+                dna["missing_fields"].append(field)
+            else:
+                dna[field] = FIELD_VALIDATORS[field].dump_python(result)
+        dna["policy_metadata"] = {**MISSING_FIELD_DEFAULTS["policy_metadata"], **dna["policy_metadata"]}
+        dna["policy_metadata"]["overall_security_score"] = compute_security_score(dna)
+        try:
+            return PolicyDNA.model_validate(dna)
+        except Exception as e:
+            logging.error(f"Field-parallel DNA validation failed: {e}")
+            return fallback_dna()
+
+    async def _summarize(self, merged: dict) -> str:
+        # The summary is the only field that needs the whole picture, so it is written from the merged DNA
+        prompt = (
+            "Write a 10-15 sentence plain-English summary of this health insurance policy for a first-time "
+            "buyer. Explain like a helpful, informed peer and avoid jargon such as \"Incurred\", \"Inception\" "
+            f"or \"Indemnity\". Return only the summary text.\n\n{json.dumps(merged)}"
+        )
+        try:
+            response = await get_llm_registry().ainvoke("mistral-small-latest", prompt)
+            return response.content.strip()
+        except Exception as e:
+            logging.error(f"Summary generation failed: {e}")
+            return "Summary unavailable; see the extracted policy details."
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _extract_json(content: str) -> str:
+    # Strip markdown code block if present
+    json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(1).strip()
+    else:
+        json_str = content.strip()
+    # Clean the JSON string by removing control characters
+    return re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_str)
+
+
+def fallback_dna() -> PolicyDNA:
+    return PolicyDNA(
+        policy_metadata={
+            "policy_id_uin": "unknown",
+            "insurer": "unknown",
+            "policy_name": "unknown",
+            "overall_security_score": 50
+        },
+        room_rent_limit={
+            "limit_type": "NO_LIMIT",
+            "value": "unknown",
+            "proportionate_deduction": False,
+            "excludes_icu_and_pharmacy": False
+        },
+        co_pay={
+            "percentage": 0.0,
+            "is_entry_age_based": False,
+            "threshold_age": None,
+            "is_zone_based": False
+        },
+        waiting_periods_months={
+            "initial": None,
+            "specific_illnesses": None,
+            "pre_existing_diseases": None
+        },
+        modern_treatments={},
+        risk_analysis={
+            "hidden_clauses": [],
+            "negative_features": [],
+            "positive_features": []
+        },
+        notice_period={
+            "planned_hours": 0,
+            "emergency_hours": 0
+        },
+        non_payable_items=[],
+        plain_english_summary="Unable to generate summary due to parsing error."
+    )
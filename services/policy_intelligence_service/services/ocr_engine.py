@@ -1,8 +1,93 @@
 import fitz  # PyMuPDF
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
+from services.policy_intelligence_service.core.config import OCR_WORKERS, OCR_PARALLEL_MIN_PAGES, OCR_PAGES_PER_TASK
 
-def process_pdf(file_path: str) -> str:
-    doc = fitz.open(file_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+# A PDF can be given as a file path or as the raw bytes of the document
+PdfSource = Union[str, bytes]
+
+PAGE_BREAK = "\f"
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _open(source: PdfSource):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _extract_range(source: PdfSource, start: int, stop: int) -> List[Tuple[int, str]]:
+    # Runs in a worker process: each task opens its own handle and reads only its page range
+    with _open(source) as doc:
+        return [(number + 1, doc[number].get_text()) for number in range(start, stop)]
+
+
+def iter_pages(source: PdfSource) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) one page at a time, 1-based, in document order."""
+    with _open(source) as doc:
+        for page in doc:
+            yield page.number + 1, page.get_text()
+
+
+def iter_pages_parallel(source: PdfSource, pages_per_task: int = OCR_PAGES_PER_TASK) -> Iterator[Tuple[int, str]]:
+    """Like iter_pages, but page ranges are extracted on a process pool.
+
+    Results are yielded in page order as soon as the next range is ready. At most
+    two ranges per worker are in flight, so the text held by the pool stays bounded;
+    what the consumer keeps is up to it. Tasks are given a file path, never the
+    document bytes: a path source (e.g. a spilled upload) is used as is, and only an
+    in-memory PDF is written to a temp file, once, for the duration of the extraction.
+    """
+    with _open(source) as doc:
+        page_count = doc.page_count
+    if page_count < OCR_PARALLEL_MIN_PAGES or OCR_WORKERS < 2:
+        yield from iter_pages(source)
+        return
+
+    temp_path = None
+    if not isinstance(source, str):
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        source = temp_path
+
+    executor = _get_executor()
+    max_in_flight = OCR_WORKERS * 2
+    pending = deque()
+    try:
+        for start in range(0, page_count, pages_per_task):
+            pending.append(executor.submit(_extract_range, source, start, min(start + pages_per_task, page_count)))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # Consumer stopped early or a range failed: don't leave work queued on the pool
+        for future in pending:
+            future.cancel()
+        if temp_path is not None:
+            os.remove(temp_path)
+
+
+def process_pdf(source: PdfSource, parallel: bool = True) -> str:
+    pages = iter_pages_parallel(source) if parallel else iter_pages(source)
+    # Pages are separated by a form feed so downstream chunking can recover page numbers
+    return PAGE_BREAK.join(text for _, text in pages)
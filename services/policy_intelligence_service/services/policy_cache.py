@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from bson import ObjectId
+from services.policy_intelligence_service.db.session import get_db
+from services.policy_intelligence_service.core.config import POLICY_CACHE_TTL_SECONDS, POLICY_CACHE_MAX_ITEMS
+
+# (user_id, policy_id) -> (expires_at, policy document)
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _get(key: tuple) -> Optional[dict]:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            _cache.pop(key, None)
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[1]
+
+
+def _put(key: tuple, policy: dict):
+    with _lock:
+        _cache[key] = (time.monotonic() + POLICY_CACHE_TTL_SECONDS, policy)
+        _cache.move_to_end(key)
+        while len(_cache) > POLICY_CACHE_MAX_ITEMS:
+            _cache.popitem(last=False)
+
+
+async def get_policy(policy_id: str, user_id: str) -> Optional[dict]:
+    """The user's policy document, served from memory for POLICY_CACHE_TTL_SECONDS after the first read."""
+    key = (user_id, policy_id)
+    policy = _get(key)
+    if policy is None:
+        policy = await get_db().policies.find_one({"_id": ObjectId(policy_id), "user_id": ObjectId(user_id)})
+        if policy is not None:
+            _put(key, policy)
+    return policy
+
+
+def invalidate_policy(policy_id: str, user_id: Optional[str] = None):
+    with _lock:
+        for key in [k for k in _cache if k[1] == policy_id and (user_id is None or k[0] == user_id)]:
+            del _cache[key]
+            _stats["invalidations"] += 1
+
+
+def policy_cache_stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {**_stats, "items": len(_cache), "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0}
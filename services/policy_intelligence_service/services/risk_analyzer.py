@@ -1,23 +1,135 @@
 import json
 import logging
 import re
-from langchain_mistralai import ChatMistralAI
-from services.policy_intelligence_service.core.constants import INSURANCE_TERMS
-from services.policy_intelligence_service.core.config import API_KEY
+from typing import Callable, List, Optional
+from bson import ObjectId
+from shared.utils.llm_registry import get_llm_registry
+from services.policy_intelligence_service.db.session import get_db
 from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
+from services.policy_intelligence_service.services import ingest_cache
+from services.policy_intelligence_service.services.policy_cache import invalidate_policy
 
-def analyze_risks(parsed_data: PolicyDNA) -> list:
+CAPPED_LIMIT_TYPES = {"CATEGORY", "PERCENTAGE", "FLAT"}
+
+
+def _amount(limit: str) -> Optional[float]:
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", limit or "")
+    return float(match.group(0).replace(",", "")) if match else None
+
+
+def _room_rent_cap(dna: PolicyDNA) -> List[str]:
+    room = dna.room_rent_limit
+    if room.limit_type.upper() not in CAPPED_LIMIT_TYPES:
+        return []
+    value = f" ({room.value})" if room.value not in (None, "", "unknown") else ""
+    return [f"Room rent is capped by {room.limit_type.lower()}{value}; a costlier room raises your out-of-pocket cost."]
+
+
+def _proportionate_deduction(dna: PolicyDNA) -> List[str]:
+    room = dna.room_rent_limit
+    if not room.proportionate_deduction:
+        return []
+    risks = ["Proportionate deduction: choosing a room above your eligibility cuts doctor, surgery and hospital charges pro-rata."]
+    if not room.excludes_icu_and_pharmacy:
+        risks.append("ICU and pharmacy charges are not protected from proportionate deduction.")
+    return risks
+
+
+def _co_pay(dna: PolicyDNA) -> List[str]:
+    co_pay = dna.co_pay
+    if co_pay.percentage is None:
+        return ["Co-payment terms could not be read from the document; check the policy wording before claiming."]
+    if co_pay.percentage <= 0:
+        return []
+    if co_pay.is_entry_age_based and co_pay.threshold_age:
+        risks = [f"Mandatory {co_pay.percentage:g}% co-payment for members entering at age {co_pay.threshold_age} or above."]
+    else:
+        risks = [f"Mandatory {co_pay.percentage:g}% co-payment on every claim."]
+    if co_pay.is_zone_based:
+        risks.append("Co-payment increases when treated in a higher-cost zone than the one you pay premium for.")
+    return risks
+
+
+def _waiting_periods(dna: PolicyDNA) -> List[str]:
+    waiting = dna.waiting_periods_months
     risks = []
-    # Basic check for hidden clauses
-    content = parsed_data.model_dump_json().lower()
-    if "hidden_clause" in content or "fine_print" in content:
-        risks.append("Potential hidden clause detected")
-    
-    # Use LLM for advanced risk analysis
-    llm = ChatMistralAI(api_key=API_KEY, model="mistral-medium-latest")
+    if (waiting.pre_existing_diseases or 0) >= 36:
+        risks.append(f"Pre-existing diseases are covered only after {waiting.pre_existing_diseases} months.")
+    if (waiting.specific_illnesses or 0) >= 24:
+        risks.append(f"Specific illnesses are covered only after {waiting.specific_illnesses} months.")
+    if (waiting.initial or 0) > 1:
+        risks.append(f"Initial waiting period of {waiting.initial} months before non-accident claims are paid.")
+    return risks
+
+
+def _modern_treatments(dna: PolicyDNA) -> List[str]:
+    risks = []
+    for name, treatment in dna.modern_treatments.items():
+        if not treatment.covered or treatment.limit.strip().lower() == "excluded":
+            risks.append(f"{name} is not covered.")
+        elif _amount(treatment.limit) is not None:
+            risks.append(f"{name} is sub-limited ({treatment.limit}).")
+    return risks
+
+
+def _notice_period(dna: PolicyDNA) -> List[str]:
+    planned = dna.notice_period.planned_hours or 0
+    emergency = dna.notice_period.emergency_hours or 0
+    risks = []
+    if planned >= 72:
+        risks.append(f"Planned hospitalisation must be intimated {planned} hours in advance or cashless may be refused.")
+    if 0 < emergency < 24:
+        risks.append(f"Emergency hospitalisation must be intimated within {emergency} hours.")
+    return risks
+
+
+def _non_payables(dna: PolicyDNA) -> List[str]:
+    items = dna.non_payable_items
+    if len(items) < 5:
+        return []
+    return [f"{len(items)} items are non-payable (e.g. {', '.join(items[:3])}); expect to pay these yourself."]
+
+
+def _hidden_clauses(dna: PolicyDNA) -> List[str]:
+    count = len(dna.risk_analysis.hidden_clauses)
+    return [f"{count} restrictive clause(s) found in the policy wording."] if count else []
+
+
+RISK_RULES: List[Callable[[PolicyDNA], List[str]]] = [
+    _room_rent_cap,
+    _proportionate_deduction,
+    _co_pay,
+    _waiting_periods,
+    _modern_treatments,
+    _notice_period,
+    _non_payables,
+    _hidden_clauses,
+]
+
+
+def _merge(*groups: List[str]) -> List[str]:
+    seen, merged = set(), []
+    for group in groups:
+        for risk in group:
+            key = risk.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(risk.strip())
+    return merged
+
+
+def analyze_risks(parsed_data: PolicyDNA) -> list:
+    """Deterministic risk list derived from the DNA fields; no I/O, runs in microseconds."""
+    rule_risks = [risk for rule in RISK_RULES for risk in rule(parsed_data)]
+    return _merge(rule_risks, parsed_data.risk_analysis.negative_features)
+
+
+async def enrich_risks_with_llm(policy_id: str, parsed_data: PolicyDNA, text_hash: Optional[str] = None) -> List[str]:
+    """Optional LLM pass that appends extra risks to the stored policy document and, given the
+    document's text hash, to its ingestion cache entry."""
     prompt = f"Analyze the following insurance policy data for risks, traps, and hidden clauses. Return a valid JSON array of strings listing identified risks, with no extra text or markdown: {parsed_data.model_dump_json()}"
     logging.debug(f"Risk analysis prompt: {prompt}")
-    response = llm.invoke(prompt)
+    response = await get_llm_registry().ainvoke("mistral-medium-latest", prompt)
     logging.debug(f"LLM risk response: {response.content}")
     # Strip markdown code block if present
     json_match = re.search(r'```json\s*(.*?)\s*```', response.content, re.DOTALL)
@@ -28,12 +140,20 @@ def analyze_risks(parsed_data: PolicyDNA) -> list:
     logging.debug(f"Extracted risk JSON: {json_str}")
     try:
         llm_risks = json.loads(json_str)
-        if isinstance(llm_risks, list):
-            risks.extend(llm_risks)
-        elif isinstance(llm_risks, dict) and "risks" in llm_risks:
-            risks.extend(llm_risks["risks"])
     except json.JSONDecodeError as e:
         logging.error(f"Risk JSON parsing failed: {e}")
-        risks.append(f"LLM Analysis: {response.content}")
-    
-    return risks
+        return []
+    if isinstance(llm_risks, dict):
+        llm_risks = llm_risks.get("risks", [])
+    if not isinstance(llm_risks, list):
+        return []
+    new_risks = [str(risk) for risk in llm_risks if str(risk).strip()]
+    if new_risks:
+        await get_db().policies.update_one(
+            {"_id": ObjectId(policy_id)},
+            {"$addToSet": {"risk_analysis.negative_features": {"$each": new_risks}}}
+        )
+        invalidate_policy(policy_id)
+        if text_hash:
+            await ingest_cache.add_risks(text_hash, new_risks)
+    return new_risks
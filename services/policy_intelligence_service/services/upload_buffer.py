@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from typing import Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from services.policy_intelligence_service.core.config import UPLOAD_MAX_BYTES, UPLOAD_SPOOL_THRESHOLD, UPLOAD_CHUNK_SIZE
+from services.policy_intelligence_service.services.ocr_engine import PdfSource
+
+
+# Room for the multipart boundaries and the other form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit"
+
+
+class UploadSizeLimitMiddleware:
+    """Caps the request body of upload routes while it is received.
+
+    Starlette parses the whole multipart body into an UploadFile before the endpoint runs, so the
+    check in read_upload alone comes after an oversized upload has been accepted. A declared
+    Content-Length over the limit is refused up front; otherwise the body is counted as it arrives.
+    """
+
+    def __init__(self, app, paths: Tuple[str, ...] = ("/policy/upload",), max_bytes: int = UPLOAD_MAX_BYTES):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self.max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            response = JSONResponse(status_code=413, content={"detail": _too_large(self.max_bytes)})
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # FastAPI re-raises HTTPExceptions from body parsing as they are
+                    raise HTTPException(status_code=413, detail=_too_large(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class SpooledUpload:
+    """An uploaded PDF held in memory, spilled to a server-named temp file above a threshold.
+
+    The SHA-256 of the content is computed while the bytes stream in, so the
+    dedup cache never has to re-read the document.
+    """
+
+    def __init__(self, filename: str, spool_threshold: int = UPLOAD_SPOOL_THRESHOLD):
+        self.filename = filename
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self.path: Optional[str] = None
+        self._hasher = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def write(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+        if self._buffer is not None and self.size > self.spool_threshold:
+            self._spill()
+        if self._buffer is not None:
+            self._buffer.write(chunk)
+        else:
+            self._file.write(chunk)
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer.getbuffer())
+        self._buffer = None
+
+    def finish(self):
+        self.sha256 = self._hasher.hexdigest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def source(self) -> PdfSource:
+        """What ocr_engine should open: the in-memory bytes, or the spill file path."""
+        return self.path if self.spilled else self._buffer.getvalue()
+
+    def head(self, n: int) -> bytes:
+        if self.spilled:
+            with open(self.path, "rb") as f:
+                return f.read(n)
+        return self._buffer.getvalue()[:n]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self._buffer = None
+
+
+async def read_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Copy a parsed UploadFile into a SpooledUpload, hashing it on the way.
+
+    By now Starlette has already received the whole body; UploadSizeLimitMiddleware is what bounds
+    it. This check enforces the exact limit on the file itself.
+    """
+    upload = SpooledUpload(file.filename)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLargeError(_too_large(max_bytes))
+            if upload.spilled or upload.size + len(chunk) > upload.spool_threshold:
+                await asyncio.to_thread(upload.write, chunk)
+            else:
+                upload.write(chunk)
+        upload.finish()
+        if not upload.head(5).startswith(b"%PDF"):
+            raise ValueError("Uploaded file is not a PDF")
+    except Exception:
+        upload.close()
+        raise
+    return upload
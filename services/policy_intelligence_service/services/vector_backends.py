@@ -0,0 +1,383 @@
+import json
+import os
+import struct
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import numpy as np
+from services.policy_intelligence_service.core.config import (
+    PINECONE_API_KEY, VECTOR_BACKEND, PINECONE_INDEX_NAME, LOCAL_VECTOR_DIR, LOCAL_VECTOR_IVF_THRESHOLD,
+    LOCAL_VECTOR_NPROBE
+)
+
+EMBED_DIM = 1024  # Mistral embedding dimension
+
+# Records are {"id": str, "values": List[float], "metadata": dict}; query matches are
+# {"id": str, "score": float, "metadata": dict}. Namespaces are per user (tenant isolation) and
+# filters use Pinecone's metadata filter syntax.
+
+
+class VectorBackend(ABC):
+    @abstractmethod
+    def upsert(self, namespace: str, records: List[dict]):
+        ...
+
+    @abstractmethod
+    def query(self, namespace: str, vector: List[float], k: int, filter: Optional[dict] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def fetch(self, namespace: str, ids: List[str]) -> Dict[str, dict]:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def list_ids(self, namespace: str, prefix: str = "") -> List[str]:
+        ...
+
+
+class PineconeBackend(VectorBackend):
+    def __init__(self, index_name: str = PINECONE_INDEX_NAME):
+        self.index_name = index_name
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        # Connect (and create the index if needed) on first use rather than at import time
+        with self._lock:
+            if self._index is None:
+                from pinecone import Pinecone, ServerlessSpec
+                pc = Pinecone(api_key=PINECONE_API_KEY)
+                if self.index_name not in pc.list_indexes().names():
+                    pc.create_index(
+                        name=self.index_name,
+                        dimension=EMBED_DIM,
+                        metric="cosine",
+                        spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                    )
+                self._index = pc.Index(self.index_name)
+        return self._index
+
+    def upsert(self, namespace: str, records: List[dict]):
+        self.index.upsert(vectors=records, namespace=namespace)
+
+    def query(self, namespace: str, vector: List[float], k: int, filter: Optional[dict] = None) -> List[dict]:
+        result = self.index.query(vector=vector, top_k=k, namespace=namespace, filter=filter or None,
+                                  include_metadata=True)
+        return [{"id": m.id, "score": m.score, "metadata": dict(m.metadata or {})} for m in result.matches]
+
+    def fetch(self, namespace: str, ids: List[str]) -> Dict[str, dict]:
+        fetched = self.index.fetch(ids=ids, namespace=namespace)
+        return {
+            vector_id: {"id": vector_id, "values": list(v.values), "metadata": dict(v.metadata or {})}
+            for vector_id, v in fetched.vectors.items()
+        }
+
+    def delete(self, namespace: str, ids: List[str]):
+        if ids:
+            self.index.delete(ids=ids, namespace=namespace)
+
+    def list_ids(self, namespace: str, prefix: str = "") -> List[str]:
+        ids = []
+        for page in self.index.list(prefix=prefix or None, namespace=namespace):
+            ids.extend(page)
+        return ids
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq/$ne/$in/$nin/$gt(e)/$lt(e), $and/$or)."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+    return True
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _IVFIndex:
+    """Inverted-file index: k-means coarse centroids, each holding the rows assigned to it."""
+
+    def __init__(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0):
+        n = vectors.shape[0]
+        self.trained_size = n
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = centroids
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self.lists: List[List[int]] = [list(np.flatnonzero(assignment == c)) for c in range(nlist)]
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        for row, c in zip(rows, np.argmax(vectors @ self.centroids.T, axis=1)):
+            self.lists[c].append(int(row))
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probe = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        return np.array(sorted(row for c in probe for row in self.lists[c]), dtype=np.int64)
+
+
+LOG_FILE = "log.bin"
+# Each log frame: header length, payload length, then a JSON header and float32 rows
+_FRAME = struct.Struct("<II")
+COMPACT_MIN_BYTES = 1 << 20
+
+
+class _Namespace:
+    def __init__(self):
+        self.ids: List[str] = []
+        self.metadata: List[dict] = []
+        self.positions: Dict[str, int] = {}
+        self.ivf: Optional[_IVFIndex] = None
+        self.log_bytes = 0
+        # Rows live in a buffer with spare capacity, so appends do not copy the whole matrix
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]  # rows are L2-normalised
+
+    def upsert(self, ids: List[str], metadata: List[dict], vectors: np.ndarray):
+        if self._matrix.shape[1] == 0:
+            self._matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        new = []
+        batch = {vector_id: (meta, vector) for vector_id, meta, vector in zip(ids, metadata, vectors)}
+        for vector_id, (meta, vector) in batch.items():
+            position = self.positions.get(vector_id)
+            if position is not None:
+                self._matrix[position] = vector
+                self.metadata[position] = meta
+                self.ivf = None  # moved vectors may belong to another cluster
+            else:
+                self.positions[vector_id] = len(self.ids) + len(new)
+                new.append((vector_id, meta, vector))
+        if not new:
+            return
+        start = len(self.ids)
+        end = start + len(new)
+        if end > self._matrix.shape[0]:
+            grown = np.zeros((max(end, 2 * self._matrix.shape[0]), self._matrix.shape[1]), dtype=np.float32)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+        block = np.stack([vector for _, _, vector in new])
+        self._matrix[start:end] = block
+        self.ids.extend(vector_id for vector_id, _, _ in new)
+        self.metadata.extend(meta for _, meta, _ in new)
+        if self.ivf is not None:
+            self.ivf.add(np.arange(start, end), block)
+
+    def delete(self, ids: List[str]) -> bool:
+        drop = {self.positions[i] for i in ids if i in self.positions}
+        if not drop:
+            return False
+        keep = [row for row in range(len(self.ids)) if row not in drop]
+        self._matrix = self.vectors[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.metadata = [self.metadata[row] for row in keep]
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self.ivf = None
+        return True
+
+
+def _frame(header: dict, vectors: Optional[np.ndarray] = None) -> bytes:
+    head = json.dumps(header).encode("utf-8")
+    payload = vectors.astype(np.float32).tobytes() if vectors is not None else b""
+    return _FRAME.pack(len(head), len(payload)) + head + payload
+
+
+class LocalBackend(VectorBackend):
+    """In-process vector index persisted to disk, one append-only log per namespace.
+
+    Upserts and deletes append a single frame, so a write costs the size of the batch, and a
+    torn final frame is cut off on load. The log is rewritten as one frame (write-then-rename)
+    once it grows past three times the live data.
+
+    Small namespaces are searched by brute-force cosine similarity in NumPy. Once a namespace
+    reaches `ivf_threshold` vectors, queries go through an IVF index and only the rows of the
+    `nprobe` nearest clusters are scored; the index is retrained when the namespace doubles.
+    """
+
+    def __init__(self, root: str = LOCAL_VECTOR_DIR, ivf_threshold: int = LOCAL_VECTOR_IVF_THRESHOLD,
+                 nprobe: int = LOCAL_VECTOR_NPROBE):
+        self.root = root
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+
+    def _dir(self, namespace: str) -> str:
+        return os.path.join(self.root, namespace)
+
+    def _log_path(self, namespace: str) -> str:
+        return os.path.join(self._dir(namespace), LOG_FILE)
+
+    def _load(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is not None:
+            return ns
+        ns = _Namespace()
+        path = self._log_path(namespace)
+        if os.path.exists(path):
+            self._replay(path, ns)
+        self._namespaces[namespace] = ns
+        return ns
+
+    def _replay(self, path: str, ns: _Namespace):
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            head_len, payload_len = _FRAME.unpack_from(data, offset)
+            end = offset + _FRAME.size + head_len + payload_len
+            if end > len(data):
+                break
+            header = json.loads(data[offset + _FRAME.size:offset + _FRAME.size + head_len])
+            if header["op"] == "upsert":
+                vectors = np.frombuffer(data, dtype=np.float32, count=payload_len // 4,
+                                        offset=offset + _FRAME.size + head_len).reshape(len(header["ids"]), -1)
+                ns.upsert(header["ids"], header["metadata"], vectors)
+            else:
+                ns.delete(header["ids"])
+            offset = end
+        if offset < len(data):
+            # A crash mid-append left a partial frame; drop it so later appends stay readable
+            os.truncate(path, offset)
+        ns.log_bytes = offset
+
+    def _append(self, namespace: str, ns: _Namespace, frame: bytes):
+        os.makedirs(self._dir(namespace), exist_ok=True)
+        with open(self._log_path(namespace), "ab") as f:
+            f.write(frame)
+        ns.log_bytes += len(frame)
+        if ns.log_bytes > max(3 * ns.vectors.nbytes, COMPACT_MIN_BYTES):
+            self._compact(namespace, ns)
+
+    def _compact(self, namespace: str, ns: _Namespace):
+        os.makedirs(self._dir(namespace), exist_ok=True)
+        path = self._log_path(namespace)
+        frame = _frame({"op": "upsert", "ids": ns.ids, "metadata": ns.metadata}, ns.vectors) if ns.ids else b""
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(frame)
+        os.replace(f"{path}.tmp", path)
+        ns.log_bytes = len(frame)
+
+    def upsert(self, namespace: str, records: List[dict]):
+        if not records:
+            return
+        with self._lock:
+            ns = self._load(namespace)
+            ids = [r["id"] for r in records]
+            metadata = [dict(r.get("metadata") or {}) for r in records]
+            values = _normalize(np.asarray([r["values"] for r in records], dtype=np.float32))
+            ns.upsert(ids, metadata, values)
+            self._append(namespace, ns, _frame({"op": "upsert", "ids": ids, "metadata": metadata}, values))
+
+    def _index_for(self, ns: _Namespace) -> Optional[_IVFIndex]:
+        n = len(ns.ids)
+        if n < self.ivf_threshold:
+            return None
+        if ns.ivf is None or n >= 2 * ns.ivf.trained_size:
+            ns.ivf = _IVFIndex(ns.vectors)
+        return ns.ivf
+
+    def query(self, namespace: str, vector: List[float], k: int, filter: Optional[dict] = None) -> List[dict]:
+        with self._lock:
+            ns = self._load(namespace)
+            if not ns.ids:
+                return []
+            query = _normalize(np.asarray([vector], dtype=np.float32))[0]
+            ivf = self._index_for(ns)
+            rows = ivf.candidates(query, self.nprobe) if ivf is not None else np.arange(len(ns.ids))
+            if filter:
+                rows = np.array([r for r in rows if matches_filter(ns.metadata[r], filter)], dtype=np.int64)
+                if ivf is not None and len(rows) < k:
+                    # Selective filter: the probed clusters may not hold k matches, so scan all filtered rows
+                    rows = np.array([r for r in range(len(ns.ids)) if matches_filter(ns.metadata[r], filter)],
+                                    dtype=np.int64)
+            if len(rows) == 0:
+                return []
+            scores = ns.vectors[rows] @ query
+            top = np.argsort(scores)[::-1][:k]
+            return [
+                {"id": ns.ids[rows[i]], "score": float(scores[i]), "metadata": dict(ns.metadata[rows[i]])}
+                for i in top
+            ]
+
+    def fetch(self, namespace: str, ids: List[str]) -> Dict[str, dict]:
+        with self._lock:
+            ns = self._load(namespace)
+            return {
+                vector_id: {"id": vector_id, "values": ns.vectors[ns.positions[vector_id]].tolist(),
+                            "metadata": dict(ns.metadata[ns.positions[vector_id]])}
+                for vector_id in ids if vector_id in ns.positions
+            }
+
+    def delete(self, namespace: str, ids: List[str]):
+        with self._lock:
+            ns = self._load(namespace)
+            if ns.delete(ids):
+                self._append(namespace, ns, _frame({"op": "delete", "ids": list(ids)}))
+
+    def list_ids(self, namespace: str, prefix: str = "") -> List[str]:
+        with self._lock:
+            return [vector_id for vector_id in self._load(namespace).ids if vector_id.startswith(prefix)]
+
+
+_backend: Optional[VectorBackend] = None
+
+
+def get_vector_backend() -> VectorBackend:
+    global _backend
+    if _backend is None:
+        if VECTOR_BACKEND == "local":
+            _backend = LocalBackend()
+        elif VECTOR_BACKEND == "pinecone":
+            _backend = PineconeBackend()
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND {VECTOR_BACKEND!r}; expected 'pinecone' or 'local'")
+    return _backend
@@ -1,71 +1,200 @@
-from dotenv import load_dotenv
-import os
-load_dotenv()
+import asyncio
+import hashlib
+from typing import List, Optional, Tuple
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_mistralai import MistralAIEmbeddings
-from langchain_pinecone import Pinecone as LangchainPinecone
-from pinecone import Pinecone, ServerlessSpec
-
-INDEX_NAME = "policies"
-EMBED_DIM = 1024  # Mistral embedding dimension
-
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-
-# Ensure index exists
-if INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=EMBED_DIM,
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region="us-east-1"
-        )
+from shared.utils.llm_registry import get_llm_registry
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from services.policy_intelligence_service.services.vector_backends import get_vector_backend
+from services.policy_intelligence_service.services import answer_cache, lexical_index
+from services.policy_intelligence_service.core.config import (
+    EMBED_BATCH_SIZE, VECTOR_UPSERT_BATCH_SIZE, VECTOR_UPSERT_CONCURRENCY, HYBRID_RRF_K
+)
+
+
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=100
+)
+
+
+def split_page_text(page: int, page_text: str) -> List[Tuple[int, str]]:
+    return [(page, chunk) for chunk in splitter.split_text(page_text)]
+
+
+def policy_document_id(policy: dict) -> Optional[str]:
+    """Key a stored policy's chunks are indexed under: the hash of its extracted text.
+
+    Policies ingested before the text hash was stored were keyed by their parsed UIN.
+    """
+    return policy.get("text_hash") or (policy.get("policy_metadata") or {}).get("policy_id_uin")
+
+
+def chunk_id_prefix(namespace: str, document_id: str) -> str:
+    return f"{namespace}#{document_id}#"
+
+
+def chunk_id(namespace: str, document_id: str, index: int, chunk: str) -> str:
+    """Deterministic vector id, so re-indexing the same text overwrites instead of duplicating."""
+    digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+    return f"{chunk_id_prefix(namespace, document_id)}{index}#{digest}"
+
+
+def _batches(items: list, size: int) -> List[list]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _record(vector_id: str, vector: List[float], document_id: str, user_id: str, index: int,
+            chunk: Tuple[int, str]) -> dict:
+    page, text = chunk
+    return {
+        "id": vector_id,
+        "values": vector,
+        # "policy_id" holds the document id chat filters on; "text" holds the chunk so retrieval
+        # can rebuild documents from metadata alone
+        "metadata": {"policy_id": document_id, "user_id": user_id, "chunk": index, "page": page, "text": text},
+    }
+
+
+async def _upsert_batches(namespace: str, records: List[dict], batch_size: int = VECTOR_UPSERT_BATCH_SIZE):
+    backend = get_vector_backend()
+    semaphore = asyncio.Semaphore(VECTOR_UPSERT_CONCURRENCY)
+
+    async def upsert(batch):
+        async with semaphore:
+            await asyncio.to_thread(backend.upsert, namespace, batch)
+    await asyncio.gather(*(upsert(batch) for batch in _batches(records, batch_size)))
+
+
+async def _existing_and_stale(document_id: str, ids: List[str], user_id: str):
+    backend = get_vector_backend()
+    existing = set(await asyncio.to_thread(backend.list_ids, user_id, chunk_id_prefix(user_id, document_id)))
+    return existing, sorted(existing - set(ids))
+
+
+async def embed_new_chunks(document_id: str, chunks: List[Tuple[int, str]], user_id: str) -> int:
+    """Embed and upsert the chunks the index does not already hold; returns how many were new.
+
+    Batches go out concurrently (the registry caps in-flight requests per model) and each one is
+    upserted as soon as its embeddings return, so embedding and upserting overlap.
+    """
+    ids = [chunk_id(user_id, document_id, i, text) for i, (_, text) in enumerate(chunks)]
+    existing, _ = await _existing_and_stale(document_id, ids, user_id)
+    pending = [i for i, vector_id in enumerate(ids) if vector_id not in existing]
+    embeddings = get_llm_registry().embeddings()
+
+    async def embed_and_upsert(batch: List[int]):
+        vectors = await embeddings.aembed_documents([chunks[i][1] for i in batch])
+        # Namespace = user, for tenant isolation
+        records = [_record(ids[i], vector, document_id, user_id, i, chunks[i]) for i, vector in zip(batch, vectors)]
+        await _upsert_batches(user_id, records)
+    await asyncio.gather(*(embed_and_upsert(batch) for batch in _batches(pending, EMBED_BATCH_SIZE)))
+    return len(pending)
+
+
+async def finalize_policy_chunks(document_id: str, chunks: List[Tuple[int, str]], user_id: str) -> List[str]:
+    """Once embed_new_chunks has run: build the BM25 index and delete chunks the text no longer has."""
+    ids = [chunk_id(user_id, document_id, i, text) for i, (_, text) in enumerate(chunks)]
+    existing, stale = await _existing_and_stale(document_id, ids, user_id)
+    missing = [vector_id for vector_id in ids if vector_id not in existing]
+    if missing:
+        raise ValueError(f"{len(missing)} chunk(s) of document {document_id} are not in the vector index")
+    await asyncio.to_thread(
+        lexical_index.build_index, user_id, document_id,
+        [_record(ids[i], None, document_id, user_id, i, chunk) for i, chunk in enumerate(chunks)]
     )
+    if stale:
+        await asyncio.to_thread(get_vector_backend().delete, user_id, stale)
+    answer_cache.invalidate(user_id, document_id)
+    print(f"Indexed {len(ids)} chunks of document {document_id} ({len(stale)} removed)")
+    return ids
 
-def index_policy_for_rag(policy_id: str, raw_text: str, user_id: str):
-    try:
-        print(f"Indexing policy {policy_id} for user {user_id}")
 
-        # 1. Split text
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100
-        )
-        chunks = splitter.split_text(raw_text)
-
-        # 2. Metadata
-        metadatas = [
-            {
-                "policy_id": policy_id,
-                "user_id": user_id,
-                "chunk": i
-            }
-            for i in range(len(chunks))
-        ]
-
-        # 3. Embeddings
-        embeddings = MistralAIEmbeddings(
-            api_key=os.getenv("MISTRAL_API_KEY")
-        )
+def copy_policy_vectors(vector_ids: list, source_namespace: str, user_id: str, document_id: str,
+                        batch_size: int = VECTOR_UPSERT_BATCH_SIZE):
+    """Copy already-embedded vectors into the user's namespace under `document_id`, without re-embedding.
 
-        # 4. Vector store (namespace = user)
-        vector_store = LangchainPinecone(
-            index_name=INDEX_NAME,
-            embedding=embeddings,
-            namespace=user_id  # tenant isolation
-        )
+    Vectors already in place (the user re-uploading their own document) are not rewritten, but the
+    BM25 index is still rebuilt from them, since deleting the policy drops it.
+    """
+    in_place = source_namespace == user_id and all(
+        v.startswith(chunk_id_prefix(user_id, document_id)) for v in vector_ids
+    )
+    backend = get_vector_backend()
+    copied = []
+    records = []
+    for batch in _batches(list(vector_ids), batch_size):
+        fetched = backend.fetch(source_namespace, batch)
+        vectors = []
+        for vector in fetched.values():
+            metadata = dict(vector["metadata"])
+            if "chunk" not in metadata or "text" not in metadata:
+                continue
+            metadata.update(user_id=user_id, policy_id=document_id)
+            # Ids are rebuilt for the target, which also re-keys entries cached under an older id scheme
+            vector_id = chunk_id(user_id, document_id, metadata["chunk"], metadata["text"])
+            vectors.append({"id": vector_id, "values": vector["values"], "metadata": metadata})
+        if vectors:
+            if not in_place:
+                backend.upsert(user_id, vectors)
+            copied.extend(v["id"] for v in vectors)
+            records.extend(vectors)
+    if len(copied) != len(vector_ids):
+        raise ValueError(f"Only {len(copied)} of {len(vector_ids)} cached vectors found in namespace {source_namespace}")
+    lexical_index.build_index(user_id, document_id, records)
+    answer_cache.invalidate(user_id, document_id)
+    if not in_place:
+        print(f"Copied {len(copied)} cached vectors into namespace {user_id}")
+    return copied
 
-        # 5. Upload vectors
-        vector_store.add_texts(
-            texts=chunks,
-            metadatas=metadatas
-        )
 
-        print(f"Indexed {len(chunks)} chunks into Pinecone cloud")
-        return vector_store
+class PolicyRetriever(BaseRetriever):
+    """Retriever over one user's namespace in whichever vector backend is configured."""
+
+    namespace: str
+    search_filter: Optional[dict] = None
+    k: int = 5
+
+    def _to_documents(self, matches: List[dict]) -> List[Document]:
+        documents = []
+        for match in matches:
+            metadata = dict(match["metadata"])
+            text = metadata.pop("text", "")
+            documents.append(Document(page_content=text, metadata={**metadata, "id": match["id"], "score": match["score"]}))
+        return documents
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector = get_llm_registry().embeddings().embed_query(query)
+        return self._to_documents(get_vector_backend().query(self.namespace, vector, self.k, self.search_filter))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector, indexes = await asyncio.gather(get_llm_registry().embeddings().aembed_query(query), self.aindexes())
+        return await self.ahybrid_search(query, vector, indexes)
 
-    except Exception as e:
-        print(f"Error indexing policy {policy_id}: {e}")
-        raise
+    @property
+    def policy_id(self) -> Optional[str]:
+        return (self.search_filter or {}).get("policy_id")
+
+    async def asearch(self, vector: List[float]) -> List[Document]:
+        """Dense retrieval with an already-computed query embedding."""
+        matches = await asyncio.to_thread(get_vector_backend().query, self.namespace, vector, self.k, self.search_filter)
+        return self._to_documents(matches)
+
+    async def aindexes(self) -> List[lexical_index.LexicalIndex]:
+        """BM25 indexes in scope, loaded off the event loop; resolve once per request."""
+        return await asyncio.to_thread(lexical_index.get_indexes, self.namespace, self.policy_id)
+
+    async def alexical_search(self, query: str, indexes: List[lexical_index.LexicalIndex]) -> List[Document]:
+        """BM25 retrieval only; needs no embedding."""
+        return self._to_documents(await asyncio.to_thread(lexical_index.search, indexes, query, self.k))
+
+    async def ahybrid_search(self, query: str, vector: List[float],
+                             indexes: List[lexical_index.LexicalIndex]) -> List[Document]:
+        """Dense and BM25 candidates (2k each) fused by reciprocal rank."""
+        dense, lexical = await asyncio.gather(
+            asyncio.to_thread(get_vector_backend().query, self.namespace, vector, 2 * self.k, self.search_filter),
+            asyncio.to_thread(lexical_index.search, indexes, query, 2 * self.k),
+        )
+        return self._to_documents(lexical_index.reciprocal_rank_fusion([dense, lexical], self.k, HYBRID_RRF_K))
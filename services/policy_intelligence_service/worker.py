@@ -1,25 +1,295 @@
 import asyncio
-from services.policy_intelligence_service.services.ocr_engine import process_pdf
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Awaitable, List, Optional, Tuple
+from bson import ObjectId
+from services.policy_intelligence_service.services.ocr_engine import PAGE_BREAK, PdfSource, iter_pages_parallel
 from services.policy_intelligence_service.services.llm_parser import PolicyParser
-from services.policy_intelligence_service.services.risk_analyzer import analyze_risks
-from services.policy_intelligence_service.services.vector_store import index_policy_for_rag
+from services.policy_intelligence_service.services.risk_analyzer import analyze_risks, enrich_risks_with_llm
+from services.policy_intelligence_service.services.vector_store import (
+    split_page_text, embed_new_chunks, finalize_policy_chunks, copy_policy_vectors
+)
+from services.policy_intelligence_service.services import ingest_cache
 from services.policy_intelligence_service.db.session import get_db
+from services.policy_intelligence_service.schemas.job_schema import IngestionJob
+from services.policy_intelligence_service.schemas.dna_schema import PolicyDNA
+from services.policy_intelligence_service.services.upload_buffer import SpooledUpload
+from services.policy_intelligence_service.core.config import (
+    INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_JOB_RETENTION, RISK_LLM_ENRICHMENT
+)
 
 parser = PolicyParser()
 
-def process_policy(file_path: str):
-    text = process_pdf(file_path)
-    parsed = asyncio.run(parser.parse_text_to_dna(text))
-    risks = analyze_risks(parsed)
-    print("hi")
-    parsed.risks = risks
-    print("hello")
-    db = get_db()
-    print("hey")
-    policy_doc = parsed.model_dump()
-    result = db.policies.insert_one(policy_doc)
-    print("done")
-    # New: Index for RAG
-    policy_id = parsed.policy_id  # Use parsed policy_id as unique identifier
-    index_policy_for_rag(policy_id, text)
-    print("RAG indexing completed")
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks = set()
+
+
+@asynccontextmanager
+async def _stage(job: IngestionJob, name: str):
+    stage = job.stage(name)
+    stage.status = "running"
+    stage.started_at = datetime.utcnow()
+    start = time.perf_counter()
+    try:
+        yield stage
+    except Exception as e:
+        stage.status = "failed"
+        stage.error = str(e)
+        raise
+    else:
+        stage.status = "completed"
+    finally:
+        stage.finished_at = datetime.utcnow()
+        stage.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _mark_cached(job: IngestionJob, *names: str):
+    for name in names:
+        job.stage(name).status = "cached"
+
+
+def _run_in_background(coro, label: str):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception():
+            logging.error(f"Background {label} failed: {t.exception()}")
+    task.add_done_callback(_done)
+
+
+def _discard(task: asyncio.Task):
+    # Cancel a branch whose result is no longer needed, or consume its exception if it already failed
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+def _extract(source: PdfSource) -> Tuple[str, List[Tuple[int, str]]]:
+    """The document text and its (page, chunk) pairs; each page is chunked as soon as it is read.
+
+    The whole text is still built in memory, because hashing and DNA parsing need the full document.
+    A spilled upload's source is its temp file path, so OCR workers read that file directly.
+    """
+    pages, chunks = [], []
+    for number, page_text in iter_pages_parallel(source):
+        pages.append(page_text)
+        chunks.extend(split_page_text(number, page_text))
+    return PAGE_BREAK.join(pages), chunks
+
+
+async def _embed(job: IngestionJob, chunks: List[Tuple[int, str]], text_hash: str):
+    # Chunks are keyed by the text hash, so a document this user already indexed is not re-embedded.
+    # Each batch is upserted as it is embedded; index_rag only finishes the index once parsing is done
+    async with _stage(job, "embed_chunks"):
+        await embed_new_chunks(text_hash, chunks, job.user_id)
+    return chunks
+
+
+async def _persist(job: IngestionJob, parsed: PolicyDNA, text_hash: str):
+    async with _stage(job, "persist"):
+        policy_doc = parsed.model_dump()
+        policy_doc["sum_insured"] = job.sum_insured
+        policy_doc["user_id"] = ObjectId(job.user_id)
+        # The key the policy's chunks are indexed under (see vector_store.policy_document_id)
+        policy_doc["text_hash"] = text_hash
+        result = await get_db().policies.insert_one(policy_doc)
+        job.policy_id = str(result.inserted_id)
+
+
+async def _index(job: IngestionJob, text_hash: str, cached: Optional[dict],
+                 embed_task: Optional[asyncio.Task], upload: SpooledUpload,
+                 chunks: Optional[List[Tuple[int, str]]]) -> Optional[List[str]]:
+    # Index the policy text for RAG; a failure here does not fail the upload
+    try:
+        if embed_task is None:
+            try:
+                async with _stage(job, "index_rag"):
+                    return await asyncio.to_thread(
+                        copy_policy_vectors, cached["vector_ids"], cached["vector_namespace"], job.user_id, text_hash
+                    )
+            except Exception as e:
+                # The source vectors were deleted since they were cached: embed from the text and repair the entry
+                print(f"Cached vectors unavailable, re-embedding: {str(e)}")
+                await ingest_cache.clear_vectors(text_hash)
+            if chunks is None:
+                async with _stage(job, "extract_text"):
+                    _, chunks = await asyncio.to_thread(_extract, upload.source)
+            vector_ids = await _finalize(job, text_hash, _embed(job, chunks, text_hash))
+            await ingest_cache.update_vectors(text_hash, vector_ids, job.user_id)
+            return vector_ids
+        return await _finalize(job, text_hash, embed_task)
+    except Exception as e:
+        print(f"Error indexing policy for RAG: {str(e)}")
+        if job.stage("index_rag").status == "pending":
+            job.stage("index_rag").status = "skipped"
+        return None
+
+
+async def _finalize(job: IngestionJob, text_hash: str, embedding: Awaitable) -> List[str]:
+    chunks = await embedding
+    async with _stage(job, "index_rag"):
+        return await finalize_policy_chunks(text_hash, chunks, job.user_id)
+
+
+def _abandon(job: IngestionJob, reason: str):
+    job.status = "failed"
+    job.error = reason
+    job.finished_at = datetime.utcnow()
+    for stage in job.stages:
+        if stage.status in ("pending", "running"):
+            stage.status = "skipped"
+
+
+async def process_policy(job: IngestionJob, upload: SpooledUpload) -> IngestionJob:
+    """Run one ingestion job as a small DAG.
+
+    extract_text feeds parse_dna and embed_chunks concurrently; analyze_risks follows parsing;
+    persist and index_rag join at the end. Every stage records its own timings.
+    """
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    embed_task = None
+    try:
+        async with _stage(job, "fingerprint"):
+            # The upload was hashed while it streamed in
+            file_hash = upload.sha256
+            cached = await ingest_cache.lookup_file(file_hash)
+        if cached:
+            job.cache_hit = "file"
+            text_hash = cached["text_hash"]
+
+        # Text is only needed when something still has to be parsed or embedded
+        text = chunks = None
+        if cached and cached.get("vector_ids"):
+            _mark_cached(job, "extract_text", "embed_chunks")
+        else:
+            async with _stage(job, "extract_text"):
+                text, chunks = await asyncio.to_thread(_extract, upload.source)
+                if not cached:
+                    text_hash = ingest_cache.hash_text(text)
+                    cached = await ingest_cache.lookup_text(text_hash, file_hash)
+                    if cached:
+                        job.cache_hit = "text"
+            if cached and cached.get("vector_ids"):
+                _mark_cached(job, "embed_chunks")
+            else:
+                embed_task = asyncio.create_task(_embed(job, chunks, text_hash))
+
+        if cached:
+            parsed = PolicyDNA.model_validate(cached["dna"])
+            risks = cached["risks"]
+            _mark_cached(job, "parse_dna", "analyze_risks")
+        else:
+            async with _stage(job, "parse_dna"):
+                parsed = await parser.parse_text_to_dna(text)
+
+            async with _stage(job, "analyze_risks"):
+                risks = analyze_risks(parsed)
+                parsed.risk_analysis.negative_features = risks
+
+        index_task = asyncio.create_task(_index(job, text_hash, cached, embed_task, upload, chunks))
+        try:
+            await _persist(job, parsed, text_hash)
+        except Exception:
+            index_task.cancel()
+            raise
+        vector_ids = await index_task
+
+        try:
+            if not cached and ingest_cache.is_cacheable(parsed):
+                await ingest_cache.store(file_hash, text_hash, parsed, risks, vector_ids, job.user_id)
+            elif cached and vector_ids and not cached.get("vector_ids"):
+                await ingest_cache.update_vectors(text_hash, vector_ids, job.user_id)
+        except Exception as e:
+            print(f"Error updating ingestion cache: {str(e)}")
+
+        if RISK_LLM_ENRICHMENT and not cached:
+            # Started once the cache entry exists, so the enriched risks are added to it as well
+            _run_in_background(enrich_risks_with_llm(job.policy_id, parsed, text_hash),
+                               f"risk enrichment for {job.policy_id}")
+
+        job.status = "completed"
+    except Exception as e:
+        logging.exception(f"Ingestion job {job.job_id} failed")
+        if embed_task is not None:
+            _discard(embed_task)
+        _abandon(job, str(e))
+    finally:
+        job.finished_at = datetime.utcnow()
+        upload.close()
+    return job
+
+
+class IngestionQueue:
+    """Bounded in-process pool that runs ingestion jobs off the request path."""
+
+    def __init__(self, workers: int = INGEST_WORKERS, maxsize: int = INGEST_QUEUE_SIZE,
+                 retention: int = INGEST_JOB_RETENTION):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.retention = retention
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still queued never ran: release their spooled uploads and report them as failed
+        while self._queue is not None and not self._queue.empty():
+            job, upload = self._queue.get_nowait()
+            upload.close()
+            _abandon(job, "Ingestion stopped before the job ran")
+        self._queue = None
+
+    async def submit(self, upload: SpooledUpload, sum_insured: float, user_id: str) -> IngestionJob:
+        """Queue a job; raises asyncio.QueueFull when the backlog is at capacity."""
+        await self.start()
+        job = IngestionJob(job_id=uuid.uuid4().hex, user_id=user_id, filename=upload.filename, sum_insured=sum_insured)
+        self._queue.put_nowait((job, upload))
+        self._jobs[job.job_id] = job
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Drop the oldest finished jobs once we hold more than `retention`
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.retention:
+                break
+            if self._jobs[job_id].status in ("completed", "failed"):
+                del self._jobs[job_id]
+
+    async def _run(self):
+        while True:
+            job, upload = await self._queue.get()
+            try:
+                await process_policy(job, upload)
+            except asyncio.CancelledError:
+                # process_policy has already closed the upload
+                _abandon(job, "Ingestion stopped before the job finished")
+                raise
+            except Exception:
+                logging.exception(f"Unhandled error in ingestion job {job.job_id}")
+            finally:
+                self._queue.task_done()
+
+
+ingestion_queue = IngestionQueue()
@@ -1,17 +1,8 @@
-from dotenv import load_dotenv
-load_dotenv()
+from shared.utils.mongo import get_mongo_client
 
-from pymongo import MongoClient
-import os
-
-MONGO_URI = os.getenv("MONGO_URI")
-
-
-client = MongoClient(MONGO_URI)
-policy_db = client.policy_intelligence
 
 def get_policy_db():
-    return policy_db
+    return get_mongo_client().policy_intelligence
 
 def get_policies_collection():
-    return policy_db.policies
+    return get_policy_db().policies
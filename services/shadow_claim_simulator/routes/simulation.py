@@ -1,23 +1,27 @@
 from fastapi import APIRouter, HTTPException, Depends
-from services.shadow_claim_simulator.schemas.models import PayoutSimulationRequest, PayoutSimulationResponse
+from fastapi.concurrency import run_in_threadpool
+from services.shadow_claim_simulator.schemas.models import (
+    PayoutSimulationRequest, PayoutSimulationResponse, BatchPayoutSimulationRequest, BatchPayoutSimulationResponse,
+    PayoutSweepRequest, PayoutSweepResponse
+)
 from services.shadow_claim_simulator.services.financial_logic import simulate_payout
+from services.shadow_claim_simulator.services.batch_engine import simulate_batch, sweep_payout
 from shared.utils.auth_middleware import get_current_user
 from services.shadow_claim_simulator.db.session import get_policies_collection
 from bson import ObjectId
-from langchain_mistralai import ChatMistralAI
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-API_KEY = os.getenv("MISTRAL_API_KEY")
+from bson.errors import InvalidId
+from shared.utils.llm_registry import get_llm_registry
 
 router = APIRouter()
 
+MAX_BATCH_BILLS = 10000
+MAX_SWEEP_POINTS = 100000
+
 @router.post("/simulate-payout")
-def simulate_payout_endpoint(request: PayoutSimulationRequest, user_id: str = Depends(get_current_user)):
+async def simulate_payout_endpoint(request: PayoutSimulationRequest, user_id: str = Depends(get_current_user)):
     try:
         policies_col = get_policies_collection()
-        policy = policies_col.find_one({"user_id": ObjectId(user_id)})
+        policy = await policies_col.find_one({"user_id": ObjectId(user_id)})
         if not policy:
             raise HTTPException(status_code=404, detail="Policy not found for user.")
         policy_dna = policy
@@ -31,7 +35,6 @@ def simulate_payout_endpoint(request: PayoutSimulationRequest, user_id: str = De
         result = simulate_payout(policy_dna, hospital_bill, stay_context)
         
         # Use LLM to format the response in human language for a naive user
-        llm = ChatMistralAI(api_key=API_KEY, model="mistral-small-2506")
         prompt = f"""
         Explain this insurance payout simulation result to a naive user in simple, easy-to-understand language. Avoid jargon or explain it simply.
 
@@ -44,7 +47,7 @@ def simulate_payout_endpoint(request: PayoutSimulationRequest, user_id: str = De
         Just provide the explanation text without extra gibberish.
         """
         messages = [{"role": "user", "content": prompt}]
-        llm_response = llm.invoke(messages)
+        llm_response = await get_llm_registry().ainvoke("mistral-small-2506", messages)
         formatted_response = llm_response.content.strip()
         
         return {"formatted_explanation": formatted_response}
@@ -52,3 +55,62 @@ def simulate_payout_endpoint(request: PayoutSimulationRequest, user_id: str = De
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/simulate-payout/batch", response_model=BatchPayoutSimulationResponse)
+async def simulate_payout_batch_endpoint(request: BatchPayoutSimulationRequest, user_id: str = Depends(get_current_user)):
+    """Run many bills against one policy. Returns the numbers only; there is no per-bill LLM explanation."""
+    if len(request.bills) > MAX_BATCH_BILLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_BILLS} bills per batch.")
+    try:
+        query = {"user_id": ObjectId(user_id)}
+        if request.policy_id:
+            query["_id"] = ObjectId(request.policy_id)
+        policy = await get_policies_collection().find_one(query)
+        if not policy:
+            raise HTTPException(status_code=404, detail="Policy not found for user.")
+        if policy.get("sum_insured", 0) == 0:
+            raise HTTPException(status_code=400, detail="Sum Insured is 0, cannot simulate payout.")
+
+        bills = [bill.model_dump() for bill in request.bills]
+        return await run_in_threadpool(simulate_batch, policy, bills)
+    except HTTPException:
+        raise
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid policy_id.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/simulate-payout/sweep", response_model=PayoutSweepResponse)
+async def simulate_payout_sweep_endpoint(request: PayoutSweepRequest, user_id: str = Depends(get_current_user)):
+    """Payout for every combination of actual rent, room category and entry age, with the highest rent
+    per category that avoids proportionate deduction. One policy lookup, no LLM explanation."""
+    points = len(request.actual_rents) * len(request.room_categories) * len(request.entry_ages or [None])
+    if points > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWEEP_POINTS} grid points per sweep.")
+    try:
+        query = {"user_id": ObjectId(user_id)}
+        if request.policy_id:
+            query["_id"] = ObjectId(request.policy_id)
+        policy = await get_policies_collection().find_one(query)
+        if not policy:
+            raise HTTPException(status_code=404, detail="Policy not found for user.")
+        if policy.get("sum_insured", 0) == 0:
+            raise HTTPException(status_code=400, detail="Sum Insured is 0, cannot simulate payout.")
+
+        hospital_bill = [item.model_dump() for item in request.hospital_bill]
+        return await run_in_threadpool(
+            sweep_payout, policy, hospital_bill, request.eligible_category_rate,
+            request.actual_rents, request.room_categories, request.entry_ages
+        )
+    except HTTPException:
+        raise
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid policy_id.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
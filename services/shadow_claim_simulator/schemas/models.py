@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class ProcedureMatchRequest(BaseModel):
     query: str
@@ -64,3 +64,56 @@ class PayoutSimulationResponse(BaseModel):
     deduction_details: DeductionDetails
     actionable_advice: str
     shaved_breakdown: ShavedPayoutBreakdown  # New field for the shaving logic output
+
+class BatchPayoutSimulationRequest(BaseModel):
+    bills: List[PayoutSimulationRequest]
+    policy_id: Optional[str] = None  # Defaults to the user's first policy, as in /simulate-payout
+
+class BillPayoutResult(BaseModel):
+    summary: Summary
+    co_pay: float
+    shaving_multiplier: float
+    shaved_breakdown: ShavedPayoutBreakdown
+
+class BatchPayoutAggregate(BaseModel):
+    bills: int
+    total_hospital_bill: float
+    estimated_payout: float
+    out_of_pocket_expense: float
+    savings_lost_to_shaving: float
+    modern_treatment_deduction: float
+    non_payable_deduction: float
+    co_pay: float
+    mean_payout_ratio: float
+    bills_with_shaving: int
+
+class BatchPayoutSimulationResponse(BaseModel):
+    results: List[BillPayoutResult]
+    aggregate: BatchPayoutAggregate
+
+class PayoutSweepRequest(BaseModel):
+    hospital_bill: List[HospitalBillItem]
+    eligible_category_rate: float
+    actual_rents: List[float]
+    room_categories: List[str]
+    entry_ages: Optional[List[int]] = None  # Defaults to the entry age stored on the policy
+    policy_id: Optional[str] = None
+
+class SweepBreakeven(BaseModel):
+    room_category: str
+    shaving_applies: bool
+    max_rent_without_shaving: Optional[float]  # None when no rent triggers proportionate deduction
+    max_grid_rent_without_shaving: Optional[float]  # None when every swept rent loses money to shaving
+
+class PayoutSweepResponse(BaseModel):
+    total_hospital_bill: float
+    non_payable_deduction: float
+    modern_treatment_deduction: float
+    actual_rents: List[float]
+    room_categories: List[str]
+    entry_ages: List[int]
+    co_pay_fraction: List[float]  # Per entry age
+    savings_lost_to_shaving: List[List[float]]  # [category][rent]
+    estimated_payout: List[List[List[float]]]  # [category][rent][entry age]
+    out_of_pocket_expense: List[List[List[float]]]  # [category][rent][entry age]
+    breakeven: List[SweepBreakeven]
@@ -0,0 +1,172 @@
+from typing import List, Optional
+import numpy as np
+from services.shadow_claim_simulator.schemas.models import (
+    BatchPayoutAggregate, BatchPayoutSimulationResponse, BillPayoutResult, PayoutSweepResponse,
+    ShavedPayoutBreakdown, SweepBreakeven
+)
+from services.shadow_claim_simulator.services.compiled_policy import CompiledPolicy, compile_policy
+
+
+class BillColumns:
+    """A batch of bills flattened to one row per line item.
+
+    `bill` maps each row back to its bill; `cap` is the modern-treatment sub-limit (inf when none
+    applies). Item names are resolved once per distinct name, not once per row.
+    """
+
+    def __init__(self, bills: List[dict], compiled: CompiledPolicy):
+        items = [(b, item) for b, bill in enumerate(bills) for item in bill["hospital_bill"]]
+        names, categories = {}, {}
+        for _, item in items:
+            names.setdefault(item["name"], len(names))
+            categories.setdefault(item.get("category", "Associated"), len(categories))
+
+        # Per distinct name / category lookups, gathered into per-row columns
+        resolved = [compiled.resolve_item(name) for name in names]
+        name_non_payable = np.array([non_payable for non_payable, _ in resolved], dtype=bool)
+        name_cap = np.array([np.inf if cap is None else cap for _, cap in resolved], dtype=np.float64)
+        category_protected = np.array([c in compiled.protected_categories for c in categories], dtype=bool)
+
+        name_code = np.fromiter((names[item["name"]] for _, item in items), dtype=np.intp, count=len(items))
+        self.category = np.fromiter(
+            (categories[item.get("category", "Associated")] for _, item in items), dtype=np.intp, count=len(items)
+        )
+        self.bill = np.fromiter((b for b, _ in items), dtype=np.intp, count=len(items))
+        self.amount = np.fromiter((item["amount"] for _, item in items), dtype=np.float64, count=len(items))
+        self.non_payable = name_non_payable[name_code]
+        self.cap = name_cap[name_code]
+        self.protected = category_protected[self.category]
+        self.bills = len(bills)
+        self.multiplier = np.array(
+            [compiled.multiplier(bill["stay_context"]) for bill in bills], dtype=np.float64
+        )
+
+
+def capped(columns: BillColumns):
+    """(payable mask, amount after treatment caps, amount over the caps) per row; non-payables count as 0."""
+    payable = ~columns.non_payable
+    base = np.where(payable, np.minimum(columns.amount, columns.cap), 0.0)
+    modern = np.where(payable, np.maximum(columns.amount - columns.cap, 0.0), 0.0)
+    return payable, base, modern
+
+
+def shave(columns: BillColumns, multiplier: np.ndarray = None) -> dict:
+    """Vectorised calculate_shaved_payout: per-bill totals as arrays of length `columns.bills`."""
+    if multiplier is None:
+        multiplier = columns.multiplier
+    n = columns.bills
+    amount = columns.amount
+    payable, base, modern = capped(columns)
+    shaved = np.where(columns.protected, base, base * multiplier[columns.bill])
+
+    def per_bill(values):
+        return np.bincount(columns.bill, weights=values, minlength=n)
+
+    return {
+        "total_claimed": per_bill(amount),
+        "admissible_amount": per_bill(shaved),
+        "savings_lost_to_shaving": per_bill(base - shaved),
+        "modern_treatment_deduction": per_bill(modern),
+        "non_payable_deduction": per_bill(np.where(payable, 0.0, amount)),
+    }
+
+
+def simulate_batch(policy_dna: dict, bills: List[dict]) -> BatchPayoutSimulationResponse:
+    """simulate_payout for many bills against one policy, without the per-bill advice text."""
+    compiled = compile_policy(policy_dna)
+    effective_cp_pct = compiled.co_pay_fraction()
+    columns = BillColumns(bills, compiled)
+    totals = shave(columns)
+
+    co_pay = totals["admissible_amount"] * effective_cp_pct
+    payout = totals["admissible_amount"] - co_pay
+    out_of_pocket = totals["total_claimed"] - payout
+    claimed = totals["total_claimed"]
+    ratio = np.divide(payout, claimed, out=np.zeros_like(payout), where=claimed > 0)
+
+    results = [
+        BillPayoutResult(
+            summary={
+                "total_hospital_bill": claimed[i],
+                "estimated_payout": payout[i],
+                "out_of_pocket_expense": out_of_pocket[i],
+            },
+            co_pay=co_pay[i],
+            shaving_multiplier=columns.multiplier[i],
+            shaved_breakdown=ShavedPayoutBreakdown(**{key: values[i] for key, values in totals.items()}),
+        )
+        for i in range(columns.bills)
+    ]
+    aggregate = BatchPayoutAggregate(
+        bills=columns.bills,
+        total_hospital_bill=claimed.sum(),
+        estimated_payout=payout.sum(),
+        out_of_pocket_expense=out_of_pocket.sum(),
+        savings_lost_to_shaving=totals["savings_lost_to_shaving"].sum(),
+        modern_treatment_deduction=totals["modern_treatment_deduction"].sum(),
+        non_payable_deduction=totals["non_payable_deduction"].sum(),
+        co_pay=co_pay.sum(),
+        mean_payout_ratio=ratio.mean() if columns.bills else 0.0,
+        bills_with_shaving=int((columns.multiplier < 1.0).sum()),
+    )
+    return BatchPayoutSimulationResponse(results=results, aggregate=aggregate)
+
+
+def sweep_payout(policy_dna: dict, hospital_bill: List[dict], eligible_rate: float, rents: List[float],
+                 categories: List[str], entry_ages: Optional[List[int]] = None) -> PayoutSweepResponse:
+    """simulate_payout over every (room category, actual rent, entry age) for one bill.
+
+    Caps and non-payables do not depend on the room, so the bill reduces to its protected and
+    unprotected admissible sums once; each grid point is then protected + unprotected * multiplier.
+    """
+    compiled = compile_policy(policy_dna)
+    if entry_ages is None:
+        entry_ages = [compiled.entry_age]
+    columns = BillColumns([{"hospital_bill": hospital_bill, "stay_context": {}}], compiled)
+    payable, base, modern = capped(columns)
+    protected = base[columns.protected].sum()
+    unprotected = base[~columns.protected].sum()
+    total_claimed = columns.amount.sum()
+
+    rent = np.asarray(rents, dtype=np.float64)
+    applies = np.array([
+        bool(compiled.shaving_cfg.get("shaving_applies", True)) and category != compiled.allowed_room_category
+        for category in categories
+    ], dtype=bool)
+    # Same rule as shaving_multiplier, for every (category, rent) at once
+    ratio = np.divide(eligible_rate, rent, out=np.ones_like(rent), where=rent > 0)
+    shaved_rent = (rent > 0) & (eligible_rate > 0)
+    multiplier = np.where(applies[:, None] & shaved_rent[None, :], np.minimum(ratio, 1.0)[None, :], 1.0)
+
+    shaved = unprotected * multiplier
+    admissible = protected + shaved
+    loss = unprotected - shaved
+    co_pay_fraction = np.array([compiled.co_pay_fraction(age) for age in entry_ages], dtype=np.float64)
+    co_pay = admissible[:, :, None] * co_pay_fraction[None, None, :]
+    payout = admissible[:, :, None] - co_pay
+    out_of_pocket = total_claimed - payout
+
+    breakeven = []
+    for c, category in enumerate(categories):
+        limited = bool(applies[c]) and eligible_rate > 0 and unprotected > 0
+        unshaved = rent[loss[c] <= 0]
+        breakeven.append(SweepBreakeven(
+            room_category=category,
+            shaving_applies=bool(applies[c]),
+            max_rent_without_shaving=eligible_rate if limited else None,
+            max_grid_rent_without_shaving=unshaved.max() if len(unshaved) else None,
+        ))
+
+    return PayoutSweepResponse(
+        total_hospital_bill=total_claimed,
+        non_payable_deduction=columns.amount[~payable].sum(),
+        modern_treatment_deduction=modern.sum(),
+        actual_rents=list(rents),
+        room_categories=list(categories),
+        entry_ages=list(entry_ages),
+        co_pay_fraction=co_pay_fraction.tolist(),
+        savings_lost_to_shaving=loss.tolist(),
+        estimated_payout=payout.tolist(),
+        out_of_pocket_expense=out_of_pocket.tolist(),
+        breakeven=breakeven,
+    )
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import List, Optional
+from services.shadow_claim_simulator.schemas.models import ShavedPayoutBreakdown
+
+DEFAULT_ROOM_CATEGORY = "Private Single A/C Room"
+PROTECTED_CATEGORIES = ["ICU", "Pharmacy", "Implants", "Diagnostics"]
+COMPILED_POLICY_CACHE_SIZE = 512
+ITEM_MEMO_SIZE = 4096
+
+# DNA fields the simulation reads; a change to any of them produces a new compiled policy
+SIMULATION_FIELDS = ("room_rent_limit", "co_pay", "user_entry_age", "modern_treatments", "non_payable_items", "sum_insured")
+
+
+def slugify(name: str) -> str:
+    return "".join(name.lower().split())
+
+
+def shaving_multiplier(policy_dna_shaving: dict, stay_context: dict) -> float:
+    actual_rent = stay_context.get("actual_rent", 0)
+    eligible_rate = stay_context.get("eligible_category_rate", 0)
+    if policy_dna_shaving.get("shaving_applies", True) and \
+            stay_context.get("chosen_category") != policy_dna_shaving.get("allowed_room_category", DEFAULT_ROOM_CATEGORY):
+        if actual_rent > 0 and eligible_rate > 0:
+            return min(eligible_rate / actual_rent, 1.0)
+    return 1.0
+
+
+class TreatmentMatcher:
+    """Finds the first treatment slug, in policy order, that contains or is contained in an item slug.
+
+    "slug in item" runs on an Aho-Corasick automaton over the treatment slugs, so one pass over the
+    item finds every treatment it contains. "item in slug" is a lookup in a table of every substring
+    of every treatment slug. Either way the earliest treatment wins.
+    """
+
+    def __init__(self, slugs: List[str]):
+        self.none = len(slugs)
+        self.goto = [{}]
+        self.first = [self.none]  # earliest treatment ending at (or, via fail links, below) each node
+        for i, slug in enumerate(slugs):
+            node = 0
+            for ch in slug:
+                child = self.goto[node].get(ch)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][ch] = child
+                    self.goto.append({})
+                    self.first.append(self.none)
+                node = child
+            self.first[node] = min(self.first[node], i)
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        for child in queue:
+            self.first[child] = min(self.first[child], self.first[0])
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.first[child] = min(self.first[child], self.first[self.fail[child]])
+                queue.append(child)
+
+        self.within = {}
+        for i, slug in enumerate(slugs):
+            for start in range(len(slug) + 1):
+                for end in range(start, len(slug) + 1):
+                    self.within.setdefault(slug[start:end], i)
+
+    def match(self, item_slug: str) -> Optional[int]:
+        found = min(self.within.get(item_slug, self.none), self.first[0])
+        node = 0
+        for ch in item_slug:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.first[node] < found:
+                found = self.first[node]
+        return None if found == self.none else found
+
+
+class CompiledPolicy:
+    """The parts of a policy the payout simulation needs, normalised once.
+
+    Treatment caps are resolved for the policy's sum insured up front. A cap that is not a number
+    is kept as text so it still fails when an item matches it, as it did before.
+    """
+
+    def __init__(self, shaving_cfg: dict, modern_treatments: dict, non_payable_items: list, sum_insured: float,
+                 co_pay_cfg: Optional[dict] = None, entry_age: int = 40):
+        self.shaving_cfg = shaving_cfg
+        self.allowed_room_category = shaving_cfg.get("allowed_room_category", DEFAULT_ROOM_CATEGORY)
+        self.protected_categories = set(shaving_cfg.get("protected_categories", PROTECTED_CATEGORIES))
+        self.sum_insured = sum_insured
+        self.co_pay_cfg = co_pay_cfg or {}
+        self.entry_age = entry_age
+        self.non_payables = {item.strip().upper() for item in non_payable_items}
+
+        normalized_modern_map = {slugify(k): v for k, v in modern_treatments.items()}
+        self.matcher = TreatmentMatcher(list(normalized_modern_map))
+        self.caps = []
+        if normalized_modern_map:
+            cap_key = str(int(sum_insured))
+            for caps in normalized_modern_map.values():
+                cap_str = caps.get(cap_key, "Up to Sum Insured")
+                if cap_str == "Up to Sum Insured":
+                    self.caps.append(None)
+                    continue
+                try:
+                    self.caps.append(float(cap_str))
+                except (TypeError, ValueError):
+                    self.caps.append(cap_str)
+        # Bill item name -> (non-payable, cap); hospitals reuse the same line item names across bills
+        self._items = {}
+
+    @classmethod
+    def from_dna(cls, policy_dna: dict) -> "CompiledPolicy":
+        room_limit_cfg = policy_dna.get("room_rent_limit", {})
+        excludes_icu_pharmacy = room_limit_cfg.get("excludes_icu_and_pharmacy", True)
+        shaving_cfg = {
+            "allowed_room_category": room_limit_cfg.get("value", DEFAULT_ROOM_CATEGORY),
+            "shaving_applies": room_limit_cfg.get("proportionate_deduction", True),
+            "protected_categories": list(PROTECTED_CATEGORIES) if excludes_icu_pharmacy else []
+        }
+        return cls(
+            shaving_cfg,
+            policy_dna.get("modern_treatments", {}),
+            policy_dna.get("non_payable_items", []),
+            policy_dna.get("sum_insured", 0),
+            policy_dna.get("co_pay", {}),
+            policy_dna.get("user_entry_age", 40),
+        )
+
+    def co_pay_fraction(self, entry_age: Optional[int] = None) -> float:
+        if entry_age is None:
+            entry_age = self.entry_age
+        if self.co_pay_cfg.get("is_entry_age_based") and entry_age < self.co_pay_cfg.get("threshold_age", 61):
+            return 0.0
+        return (self.co_pay_cfg.get("percentage") or 0) / 100
+
+    def is_non_payable(self, name: str) -> bool:
+        return name.strip().upper() in self.non_payables
+
+    def treatment_cap(self, name: str) -> Optional[float]:
+        index = self.matcher.match(slugify(name))
+        if index is None:
+            return None
+        cap = self.caps[index]
+        return cap if cap is None or isinstance(cap, float) else float(cap)
+
+    def resolve_item(self, name: str) -> tuple:
+        resolved = self._items.get(name)
+        if resolved is None:
+            resolved = (self.is_non_payable(name), self.treatment_cap(name))
+            if len(self._items) >= ITEM_MEMO_SIZE:
+                self._items.clear()
+            self._items[name] = resolved
+        return resolved
+
+    def multiplier(self, stay_context: dict) -> float:
+        return shaving_multiplier(self.shaving_cfg, stay_context)
+
+    def shave(self, hospital_bill: list, stay_context: dict) -> ShavedPayoutBreakdown:
+        multiplier = self.multiplier(stay_context)
+        total_claimed = 0
+        admissible_amount = 0
+        savings_lost_shaving = 0
+        modern_deduction = 0
+        non_payable_total = 0
+
+        for item in hospital_bill:
+            amount = item['amount']
+            total_claimed += amount
+            category = item.get('category', 'Associated')
+
+            non_payable, cap_limit = self.resolve_item(item['name'])
+            if non_payable:
+                non_payable_total += amount
+                continue
+
+            current_item_base = amount
+            if cap_limit is not None and amount > cap_limit:
+                modern_deduction += (amount - cap_limit)
+                current_item_base = cap_limit
+
+            if category in self.protected_categories:
+                admissible_amount += current_item_base
+            else:
+                shaved_val = current_item_base * multiplier
+                admissible_amount += shaved_val
+                savings_lost_shaving += (current_item_base - shaved_val)
+
+        return ShavedPayoutBreakdown(
+            total_claimed=total_claimed,
+            admissible_amount=admissible_amount,
+            savings_lost_to_shaving=savings_lost_shaving,
+            modern_treatment_deduction=modern_deduction,
+            non_payable_deduction=non_payable_total
+        )
+
+
+# (policy id, content fingerprint) -> CompiledPolicy, most recently used last
+_cache: "OrderedDict[tuple, CompiledPolicy]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def policy_fingerprint(policy_dna: dict) -> str:
+    fields = {field: policy_dna.get(field) for field in SIMULATION_FIELDS}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def compile_policy(policy_dna: dict) -> CompiledPolicy:
+    """Compiled form of a stored policy, reused while its simulation fields are unchanged."""
+    key = (str(policy_dna.get("_id")), policy_fingerprint(policy_dna))
+    with _lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return compiled
+        _stats["misses"] += 1
+    compiled = CompiledPolicy.from_dna(policy_dna)
+    with _lock:
+        _cache[key] = compiled
+        while len(_cache) > COMPILED_POLICY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def compiled_policy_stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {**_stats, "items": len(_cache), "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0}
@@ -1,8 +1,4 @@
-from dotenv import load_dotenv
-import os
-load_dotenv()
-
-from langchain_mistralai import MistralAIEmbeddings
+from shared.utils.llm_registry import get_llm_registry
 import numpy as np
 
 # Mock ROHINI Procedure Codes
@@ -19,11 +15,19 @@ mock_procedures = [
     {"name": "Angioplasty", "base_cost": 200000, "standard_room_rate": 4000},
 ]
 
-embeddings = MistralAIEmbeddings(api_key=os.getenv("API_KEY"))
-procedure_embeddings = np.array(embeddings.embed_documents([p["name"] for p in mock_procedures]))
+_procedure_embeddings = None
+
+def get_procedure_embeddings() -> np.ndarray:
+    # Embedded on first use; the persistent embedding cache serves the catalog on later restarts
+    global _procedure_embeddings
+    if _procedure_embeddings is None:
+        embeddings = get_llm_registry().embeddings()
+        _procedure_embeddings = np.array(embeddings.embed_documents([p["name"] for p in mock_procedures]))
+    return _procedure_embeddings
 
 def match_procedure(query: str):
-    query_embedding = np.array(embeddings.embed_query(query))
+    procedure_embeddings = get_procedure_embeddings()
+    query_embedding = np.array(get_llm_registry().embeddings().embed_query(query))
     # Compute cosine similarities
     similarities = np.dot(procedure_embeddings, query_embedding) / (np.linalg.norm(procedure_embeddings, axis=1) * np.linalg.norm(query_embedding))
     top_indices = np.argsort(similarities)[::-1][:3]
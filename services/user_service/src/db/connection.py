@@ -1,10 +1,8 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
+from shared.utils.mongo import get_mongo_client
 
-load_dotenv()
 
-MONGO_URL = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URL)
-database = client["user_db"]
-user_collection = database["users"]
+def get_database():
+    return get_mongo_client()["user_db"]
+
+def get_user_collection():
+    return get_database()["users"]
@@ -1,42 +1,54 @@
-from .connection import user_collection
+from .connection import get_user_collection
 from ..models.user import UserCreate, UserResponse
-from shared.utils.auth_utils import get_password_hash
+from shared.utils.auth_utils import aget_password_hash
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from typing import List, Optional
 
 class UserRepository:
     async def create_user(self, user: UserCreate) -> str:
-        result = await user_collection.insert_one(user.dict())
+        try:
+            result = await get_user_collection().insert_one(user.dict())
+        except DuplicateKeyError:
+            raise ValueError("User already exists")
         return str(result.inserted_id)
 
     async def get_user(self, user_id: str) -> Optional[UserResponse]:
-        user = await user_collection.find_one({"_id": ObjectId(user_id)})
+        user = await get_user_collection().find_one({"_id": ObjectId(user_id)})
         if user:
             return UserResponse(id=str(user["_id"]), **user)
         return None
 
     async def get_all_users(self) -> List[UserResponse]:
         users = []
-        async for user in user_collection.find():
+        async for user in get_user_collection().find():
             users.append(UserResponse(id=str(user["_id"]), **user))
         return users
 
     async def update_user(self, user_id: str, user: UserCreate) -> bool:
-        result = await user_collection.update_one({"_id": ObjectId(user_id)}, {"$set": user.dict()})
+        result = await get_user_collection().update_one({"_id": ObjectId(user_id)}, {"$set": user.dict()})
         return result.modified_count > 0
 
     async def delete_user(self, user_id: str) -> bool:
-        result = await user_collection.delete_one({"_id": ObjectId(user_id)})
+        result = await get_user_collection().delete_one({"_id": ObjectId(user_id)})
         return result.deleted_count > 0
 
     async def create_user_with_password(self, user: UserCreate) -> str:
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await aget_password_hash(user.password)
         user_data = user.dict()
         user_data["password"] = hashed_password
-        result = await user_collection.insert_one(user_data)
+        try:
+            result = await get_user_collection().insert_one(user_data)
+        except DuplicateKeyError:
+            # Unique email index: a concurrent signup with the same email got there first
+            raise ValueError("User already exists")
         return str(result.inserted_id)
 
+    async def update_password_hash(self, user_id, hashed_password: str) -> bool:
+        result = await get_user_collection().update_one({"_id": ObjectId(user_id)}, {"$set": {"password": hashed_password}})
+        return result.modified_count > 0
+
     async def get_user_by_email(self, email: str) -> Optional[dict]:
-        user = await user_collection.find_one({"email": email})
+        user = await get_user_collection().find_one({"email": email})
         print(f"Fetched user by email: {user}")
         return user
@@ -1,6 +1,7 @@
 from ..db.user_repository import UserRepository
 from ..models.user import UserCreate, UserResponse, UserLogin, Token
-from shared.utils.auth_utils import verify_password, create_access_token
+from shared.utils.auth_utils import averify_password, aget_password_hash, password_needs_rehash, create_access_token
+from shared.utils.principal_cache import principal_cache
 from typing import List, Optional
 
 class UserService:
@@ -17,10 +18,17 @@ class UserService:
         return await self.repository.get_all_users()
 
     async def update_user(self, user_id: str, user: UserCreate) -> bool:
-        return await self.repository.update_user(user_id, user)
+        updated = await self.repository.update_user(user_id, user)
+        if updated:
+            # The email may have changed, so tokens keyed by the old one must resolve again
+            principal_cache.invalidate_user(user_id)
+        return updated
 
     async def delete_user(self, user_id: str) -> bool:
-        return await self.repository.delete_user(user_id)
+        deleted = await self.repository.delete_user(user_id)
+        if deleted:
+            principal_cache.invalidate_user(user_id, deleted=True)
+        return deleted
 
     async def signup(self, user: UserCreate) -> str:
         # Check if user exists
@@ -32,7 +40,11 @@ class UserService:
     async def login(self, user: UserLogin) -> Token:
         db_user = await self.repository.get_user_by_email(user.email)
         print(f"DB User: {db_user}")
-        if not db_user or not verify_password(user.password, db_user["password"]):
+        if not db_user or not await averify_password(user.password, db_user["password"]):
             raise ValueError("Invalid credentials")
-        access_token = create_access_token(data={"sub": user.email})
+        if password_needs_rehash(db_user["password"]):
+            # Upgrade (or downgrade) the stored hash to the configured work factor while we have the password
+            await self.repository.update_password_hash(db_user["_id"], await aget_password_hash(user.password))
+        # "uid" lets get_current_user authenticate without looking the email up
+        access_token = create_access_token(data={"sub": user.email, "uid": str(db_user["_id"])})
         return Token(access_token=access_token)
@@ -1,17 +1,47 @@
+import time
+from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .auth_utils import verify_token
+from .auth_utils import decode_token
+from .principal_cache import principal_cache, MISSING
 from services.policy_intelligence_service.db.session import get_users_collection
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    email = verify_token(token)
-    if email is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    users_col = get_users_collection()
-    user = users_col.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return str(user["_id"])
+
+async def _resolve(payload: dict):
+    # Tokens issued since the "uid" claim was added are keyed by user id; older ones by email
+    uid = payload.get("uid")
+    key = uid or f"email:{payload['sub']}"
+    user_id = principal_cache.get(key)
+    if user_id is MISSING:
+        if uid:
+            try:
+                query = {"_id": ObjectId(uid)}
+            except InvalidId:
+                query = None
+        else:
+            query = {"email": payload["sub"]}
+        user = await get_users_collection().find_one(query, projection={"_id": 1}) if query else None
+        user_id = str(user["_id"]) if user else None
+        principal_cache.put(key, user_id)
+    return user_id
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    start = time.perf_counter()
+    try:
+        payload = decode_token(credentials.credentials)
+        if payload is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        user_id = await _resolve(payload)
+        if not user_id:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        return user_id
+    finally:
+        principal_cache.record(time.perf_counter() - start)
+
+
+def auth_stats() -> dict:
+    return principal_cache.stats()
@@ -1,3 +1,7 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
@@ -8,11 +12,74 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 300
 
+# bcrypt work factor for new hashes; existing hashes with another cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a few threads give real parallelism without starving the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_hash_stats = {"completed": 0, "pending": 0, "max_pending": 0, "total_ms": 0.0, "max_ms": 0.0}
+
 def verify_password(plain_password, hashed_password):
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def get_password_hash(password, rounds: int = BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def password_needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+def shutdown_password_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+async def _offload(fn, *args):
+    """Run password work on the bounded bcrypt pool, tracking how many calls are queued or running."""
+    with _executor_lock:
+        _hash_stats["pending"] += 1
+        _hash_stats["max_pending"] = max(_hash_stats["max_pending"], _hash_stats["pending"])
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with _executor_lock:
+            _hash_stats["pending"] -= 1
+            _hash_stats["completed"] += 1
+            _hash_stats["total_ms"] += elapsed_ms
+            _hash_stats["max_ms"] = max(_hash_stats["max_ms"], elapsed_ms)
+
+async def averify_password(plain_password, hashed_password) -> bool:
+    return await _offload(verify_password, plain_password, hashed_password)
+
+async def aget_password_hash(password) -> str:
+    return await _offload(get_password_hash, password)
+
+def password_hash_stats() -> dict:
+    with _executor_lock:
+        completed = _hash_stats["completed"]
+        return {
+            **_hash_stats,
+            "workers": PASSWORD_HASH_WORKERS,
+            "rounds": BCRYPT_ROUNDS,
+            # Includes time spent waiting for a worker, so it grows with queue depth
+            "avg_ms": round(_hash_stats["total_ms"] / completed, 2) if completed else 0.0,
+        }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -24,12 +91,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str):
+    payload = decode_token(token)
+    return payload["sub"] if payload else None
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so give each process its own EMBED_CACHE_DIR
+    fcntl = None
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(os.getcwd(), "temp", "embedding_cache"))
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "20000"))
+
+KEY_BYTES = 32  # sha256 digest
+
+
+class EmbeddingCache:
+    """Content-addressed (model, text) -> vector cache with an in-memory LRU and an on-disk tier.
+
+    The disk tier for each model is two append-only files: `keys.bin` holds fixed-size text
+    digests and `vectors.f32` the matching float32 rows, read back through a memory map. Rows are
+    written before their keys; on load both files are truncated to the rows they have in common,
+    so a crash mid-append never leaves a key pointing at another text's vector.
+
+    Processes may share the directory (e.g. several uvicorn workers): appends and reloads hold an
+    exclusive flock on `lock`, and a writer first picks up rows other processes appended so its
+    own rows land at the offsets it records.
+    """
+
+    def __init__(self, model: str, directory: str = EMBED_CACHE_DIR, memory_items: int = EMBED_CACHE_MEMORY_ITEMS):
+        self.model = model
+        self.directory = os.path.join(directory, model.replace("/", "_"))
+        self.memory_items = memory_items
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._rows: Dict[bytes, int] = {}
+        self._file_rows = 0  # complete rows on disk as of the last sync
+        self._dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._load()
+
+    @property
+    def _keys_path(self) -> str:
+        return os.path.join(self.directory, "keys.bin")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self.directory, "lock")
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # released when the file closes
+            yield
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with self._file_lock():
+            self._sync()
+
+    def _sync(self):
+        # Catch up with rows appended since we last looked (by us or another process); file lock held
+        if self._dim is None:
+            if not os.path.exists(self._meta_path):
+                return
+            with open(self._meta_path) as f:
+                self._dim = json.load(f)["dim"]
+        known = self._file_rows
+        key_bytes = os.path.getsize(self._keys_path) if os.path.exists(self._keys_path) else 0
+        vector_bytes = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        rows = min(key_bytes // KEY_BYTES, vector_bytes // (self._dim * 4))
+        self._truncate(rows)
+        if rows > known:
+            with open(self._keys_path, "rb") as f:
+                f.seek(known * KEY_BYTES)
+                keys = f.read((rows - known) * KEY_BYTES)
+            for i in range(rows - known):
+                self._rows.setdefault(keys[i * KEY_BYTES:(i + 1) * KEY_BYTES], known + i)
+        self._file_rows = rows
+        self._remap()
+
+    def _truncate(self, rows: int):
+        # Drop a torn append (no writer is mid-append while we hold the file lock), so the next
+        # row written lands at offset `rows` in both files
+        for path, size in ((self._keys_path, rows * KEY_BYTES), (self._vectors_path, rows * self._dim * 4)):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            elif os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+    def _remap(self):
+        rows = self._file_rows
+        self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim)) if rows else None
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector
+            row = self._rows.get(key)
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if self._mmap is None or row >= self._mmap.shape[0]:
+                self._remap()
+            vector = np.array(self._mmap[row])
+            self._stats["disk_hits"] += 1
+            self._remember(key, vector)
+            return vector
+
+    def put_many(self, items: List[tuple]):
+        """Persist (key, vector) pairs that are not cached yet."""
+        with self._lock:
+            new = list({
+                key: np.asarray(vector, dtype=np.float32) for key, vector in items if key not in self._rows
+            }.items())
+            for key, vector in new:
+                self._remember(key, vector)
+            if not new:
+                return
+            with self._file_lock():
+                self._sync()
+                if self._dim is None:
+                    self._dim = int(new[0][1].shape[0])
+                    with open(self._meta_path, "w") as f:
+                        json.dump({"model": self.model, "dim": self._dim}, f)
+                new = [(key, vector) for key, vector in new if key not in self._rows and vector.shape == (self._dim,)]
+                if not new:
+                    return
+                start = self._file_rows
+                try:
+                    with open(self._vectors_path, "ab") as f:
+                        f.write(np.stack([vector for _, vector in new]).tobytes())
+                    with open(self._keys_path, "ab") as f:
+                        f.write(b"".join(key for key, _ in new))
+                except OSError:
+                    self._truncate(start)
+                    raise
+                for i, (key, _) in enumerate(new):
+                    self._rows[key] = start + i
+                self._file_rows = start + len(new)
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._rows),
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any LangChain Embeddings so only texts never seen before reach the provider."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache):
+        self.inner = inner
+        self.cache = cache
+
+    def _split(self, texts: List[str]):
+        keys = [self.cache.key(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        # Duplicate texts within one batch are embedded once
+        missing = list(OrderedDict((key, text) for key, text, vector in zip(keys, texts, vectors) if vector is None).items())
+        return keys, vectors, missing
+
+    def _fill(self, keys, vectors, missing, embedded) -> List[List[float]]:
+        fresh = {key: np.asarray(vector, dtype=np.float32) for (key, _), vector in zip(missing, embedded)}
+        self.cache.put_many(list(fresh.items()))
+        return [(vector if vector is not None else fresh[key]).tolist() for key, vector in zip(keys, vectors)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._split(texts)
+        embedded = self.inner.embed_documents([text for _, text in missing]) if missing else []
+        return self._fill(keys, vectors, missing, embedded)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._split(texts)
+        embedded = await self.inner.aembed_documents([text for _, text in missing]) if missing else []
+        return self._fill(keys, vectors, missing, embedded)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str) -> EmbeddingCache:
+    with _caches_lock:
+        if model not in _caches:
+            _caches[model] = EmbeddingCache(model)
+        return _caches[model]
+
+
+def embedding_cache_stats() -> Dict[str, dict]:
+    return {model: cache.stats() for model, cache in _caches.items()}
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import httpx
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_mistralai import ChatMistralAI, MistralAIEmbeddings
+from shared.utils.embedding_cache import EMBED_CACHE_ENABLED, CachedEmbeddings, get_embedding_cache
+
+load_dotenv()
+
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+MISTRAL_BASE_URL = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "1.0"))
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "8"))
+# Per-model overrides, e.g. "mistral-large-latest=4,mistral-embed=16"
+LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+
+EMBED_MODEL = "mistral-embed"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _parse_concurrency(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, limit = item.partition("=")
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying `error`, or None if it should not be retried."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None and status not in RETRYABLE_STATUS_CODES:
+        return None
+    if status is None and not isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return None
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+
+
+class _Usage:
+    """Adapts the usage metadata of a finished stream to what `_record` reads from a result."""
+
+    def __init__(self, usage_metadata: dict):
+        self.usage_metadata = usage_metadata
+
+
+class ManagedEmbeddings(Embeddings):
+    """LangChain Embeddings that route every call through the registry's limits, retries and accounting."""
+
+    def __init__(self, registry: "LLMRegistry", model: str):
+        self.registry = registry
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        client = self.registry.embedding_client(self.model)
+        return self.registry.call(self.model, lambda: client.embed_documents(texts), units=len(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        client = self.registry.embedding_client(self.model)
+        return self.registry.call(self.model, lambda: client.embed_query(text), units=1)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        client = self.registry.embedding_client(self.model)
+        return await self.registry.acall(self.model, lambda: client.aembed_documents(texts), units=len(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        client = self.registry.embedding_client(self.model)
+        return await self.registry.acall(self.model, lambda: client.aembed_query(text), units=1)
+
+
+class LLMRegistry:
+    """Process-wide Mistral chat/embedding clients sharing one keep-alive HTTP pool.
+
+    Every call goes through a per-model concurrency limit, is retried with backoff on
+    rate limits and transient errors, and is accounted for (latency, tokens, retries).
+    """
+
+    def __init__(self, api_key: Optional[str] = MISTRAL_API_KEY):
+        self.api_key = api_key
+        self._limits = _parse_concurrency(LLM_MODEL_CONCURRENCY)
+        self._lock = threading.Lock()
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._chat_models: Dict[tuple, ChatMistralAI] = {}
+        self._embedding_clients: Dict[str, MistralAIEmbeddings] = {}
+        self._async_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._sync_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def _http_kwargs(self) -> dict:
+        return {
+            "base_url": MISTRAL_BASE_URL,
+            "headers": {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "Authorization": f"Bearer {self.api_key}",
+            },
+            "timeout": LLM_TIMEOUT_SECONDS,
+            "limits": httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        }
+
+    def _clients(self):
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**self._http_kwargs())
+                self._async_client = httpx.AsyncClient(**self._http_kwargs())
+        return self._sync_client, self._async_client
+
+    def chat(self, model: str, **kwargs) -> ChatMistralAI:
+        key = (model, tuple(sorted(kwargs.items())))
+        llm = self._chat_models.get(key)
+        if llm is None:
+            client, async_client = self._clients()
+            # The registry owns retries (LLM_MAX_RETRIES); the client's own tenacity loop would multiply them
+            llm = ChatMistralAI(api_key=self.api_key, model=model, client=client, async_client=async_client,
+                                max_retries=0, **kwargs)
+            self._chat_models[key] = llm
+        return llm
+
+    def embedding_client(self, model: str = EMBED_MODEL) -> MistralAIEmbeddings:
+        embeddings = self._embedding_clients.get(model)
+        if embeddings is None:
+            client, async_client = self._clients()
+            embeddings = MistralAIEmbeddings(api_key=self.api_key, model=model, client=client, async_client=async_client,
+                                             max_retries=None)  # None disables its retry wrapper
+            self._embedding_clients[model] = embeddings
+        return embeddings
+
+    def embeddings(self, model: str = EMBED_MODEL, cached: bool = EMBED_CACHE_ENABLED) -> Embeddings:
+        managed = ManagedEmbeddings(self, model)
+        return CachedEmbeddings(managed, get_embedding_cache(model)) if cached else managed
+
+    async def ainvoke(self, model: str, messages: Any, **kwargs):
+        llm = self.chat(model, **kwargs)
+        return await self.acall(model, lambda: llm.ainvoke(messages))
+
+    async def astream(self, model: str, messages: Any, **kwargs) -> AsyncIterator[Any]:
+        """Yield message chunks as the model produces them.
+
+        The model's concurrency slot is held for the whole stream. Failures before the first
+        chunk are retried like any other call; once tokens have been yielded an error is raised
+        as-is. Closing the iterator (e.g. on client disconnect) closes the upstream request.
+        """
+        llm = self.chat(model, **kwargs)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            first_token_at = None
+            usage = {}
+            try:
+                async with self._async_semaphore(model):
+                    stream = llm.astream(messages)
+                    try:
+                        async for chunk in stream:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                            usage = getattr(chunk, "usage_metadata", None) or usage
+                            yield chunk
+                    finally:
+                        await stream.aclose()
+            except (asyncio.CancelledError, GeneratorExit):
+                self._record(model, time.perf_counter() - start, ttft=self._ttft(start, first_token_at))
+                raise
+            except Exception as e:
+                delay = _retry_delay(e, attempt) if attempt < LLM_MAX_RETRIES and first_token_at is None else None
+                self._record(model, time.perf_counter() - start, error=True, retried=delay is not None,
+                             ttft=self._ttft(start, first_token_at))
+                if delay is None:
+                    raise
+                logging.warning(f"{model} stream failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record(model, time.perf_counter() - start, result=_Usage(usage),
+                         ttft=self._ttft(start, first_token_at))
+            return
+
+    @staticmethod
+    def _ttft(start: float, first_token_at: Optional[float]) -> Optional[float]:
+        return first_token_at - start if first_token_at is not None else None
+
+    def invoke(self, model: str, messages: Any, **kwargs):
+        llm = self.chat(model, **kwargs)
+        return self.call(model, lambda: llm.invoke(messages))
+
+    def _limit(self, model: str) -> int:
+        return self._limits.get(model, LLM_DEFAULT_CONCURRENCY)
+
+    def _async_semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._async_semaphores:
+            self._async_semaphores[model] = asyncio.Semaphore(self._limit(model))
+        return self._async_semaphores[model]
+
+    def _sync_semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if model not in self._sync_semaphores:
+                self._sync_semaphores[model] = threading.BoundedSemaphore(self._limit(model))
+        return self._sync_semaphores[model]
+
+    async def acall(self, model: str, factory: Callable[[], Any], units: int = 0):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                async with self._async_semaphore(model):
+                    result = await factory()
+            except Exception as e:
+                delay = _retry_delay(e, attempt) if attempt < LLM_MAX_RETRIES else None
+                self._record(model, time.perf_counter() - start, error=True, retried=delay is not None)
+                if delay is None:
+                    raise
+                logging.warning(f"{model} call failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record(model, time.perf_counter() - start, result=result, units=units)
+            return result
+
+    def call(self, model: str, fn: Callable[[], Any], units: int = 0):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with self._sync_semaphore(model):
+                    result = fn()
+            except Exception as e:
+                delay = _retry_delay(e, attempt) if attempt < LLM_MAX_RETRIES else None
+                self._record(model, time.perf_counter() - start, error=True, retried=delay is not None)
+                if delay is None:
+                    raise
+                logging.warning(f"{model} call failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._record(model, time.perf_counter() - start, result=result, units=units)
+            return result
+
+    def _record(self, model: str, elapsed: float, result: Any = None, units: int = 0,
+                error: bool = False, retried: bool = False, ttft: Optional[float] = None):
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                "calls": 0, "errors": 0, "retries": 0, "total_latency_ms": 0.0, "max_latency_ms": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "embedded_texts": 0,
+                "streams": 0, "total_ttft_ms": 0.0, "max_ttft_ms": 0.0,
+            })
+            if ttft is not None:
+                # Time to first token is the latency a streaming user actually perceives
+                stats["streams"] += 1
+                stats["total_ttft_ms"] += ttft * 1000
+                stats["max_ttft_ms"] = max(stats["max_ttft_ms"], ttft * 1000)
+            latency_ms = elapsed * 1000
+            stats["calls"] += 1
+            stats["total_latency_ms"] += latency_ms
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
+            if error:
+                stats["errors"] += 1
+            if retried:
+                stats["retries"] += 1
+            stats["embedded_texts"] += units
+            usage = getattr(result, "usage_metadata", None) or {}
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                model: {
+                    **s,
+                    "avg_latency_ms": round(s["total_latency_ms"] / s["calls"], 2) if s["calls"] else 0.0,
+                    "avg_ttft_ms": round(s["total_ttft_ms"] / s["streams"], 2) if s["streams"] else 0.0,
+                }
+                for model, s in self._stats.items()
+            }
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+        if self._sync_client is not None:
+            self._sync_client.close()
+        self._sync_client = self._async_client = None
+        self._chat_models.clear()
+        self._embedding_clients.clear()
+
+
+_registry: Optional[LLMRegistry] = None
+
+
+def get_llm_registry() -> LLMRegistry:
+    global _registry
+    if _registry is None:
+        _registry = LLMRegistry()
+    return _registry
+
+
+async def close_llm_registry():
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
@@ -0,0 +1,41 @@
+from typing import Dict, List, Tuple
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from shared.utils.mongo import get_mongo_client
+
+# Index declarations for every hot query shape, keyed by (database, collection). create_indexes is
+# a no-op for indexes that already exist with the same spec, so this is safe to run on every start.
+
+USER_INDEXES = [
+    # Login, signup and token resolution by email; unique so concurrent signups cannot both succeed
+    IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+]
+
+POLICY_INDEXES = [
+    # find({"user_id"}) listings (sorted/paged by _id), find_one({"user_id"}) in the simulator,
+    # and {"_id", "user_id"} ownership checks on get/delete
+    IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+]
+
+INGESTION_CACHE_INDEXES = [
+    IndexModel([("text_hash", ASCENDING)], unique=True, name="text_hash_unique"),
+    IndexModel([("file_hashes", ASCENDING)], name="file_hashes"),
+]
+
+INDEXES: Dict[Tuple[str, str], List[IndexModel]] = {
+    ("user_db", "users"): USER_INDEXES,
+    ("policy_intelligence", "policies"): POLICY_INDEXES,
+    ("policy_intelligence", "ingestion_cache"): INGESTION_CACHE_INDEXES,
+}
+
+
+async def ensure_indexes(client=None) -> Dict[str, List[str]]:
+    """Create any missing indexes; a failure on one collection is logged and does not block startup."""
+    client = client or get_mongo_client()
+    created = {}
+    for (database, collection), models in INDEXES.items():
+        try:
+            created[f"{database}.{collection}"] = await client[database][collection].create_indexes(models)
+        except PyMongoError as e:
+            print(f"Error creating indexes on {database}.{collection}: {e}")
+    return created
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+# Unknown principals are remembered briefly so a stale or forged token cannot hammer the database
+AUTH_NEGATIVE_TTL_SECONDS = float(os.getenv("AUTH_NEGATIVE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ITEMS = int(os.getenv("AUTH_CACHE_MAX_ITEMS", "50000"))
+
+# Returned by PrincipalCache.get when the subject is not cached at all
+MISSING = object()
+
+
+class PrincipalCache:
+    """TTL'd token-subject -> user id map; a cached None means the user is known not to exist."""
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL_SECONDS, negative_ttl: float = AUTH_NEGATIVE_TTL_SECONDS,
+                 max_items: int = AUTH_CACHE_MAX_ITEMS):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "invalidations": 0,
+                       "requests": 0, "total_auth_ms": 0.0, "max_auth_ms": 0.0}
+
+    def get(self, key: str):
+        """The cached user id (or None for a known-missing user), or MISSING when not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self._stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits" if entry[1] is not None else "negative_hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, user_id: Optional[str]):
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, user_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str, deleted: bool = False):
+        """Drop every subject that resolves to user_id; a deleted user is also cached as missing."""
+        with self._lock:
+            for key in [k for k, (_, value) in self._entries.items() if value == user_id or k == user_id]:
+                del self._entries[key]
+                self._stats["invalidations"] += 1
+        if deleted:
+            self.put(user_id, None)
+
+    def record(self, elapsed: float):
+        with self._lock:
+            elapsed_ms = elapsed * 1000
+            self._stats["requests"] += 1
+            self._stats["total_auth_ms"] += elapsed_ms
+            self._stats["max_auth_ms"] = max(self._stats["max_auth_ms"], elapsed_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+            requests = self._stats["requests"]
+            return {
+                **self._stats,
+                "items": len(self._entries),
+                "hit_rate": round((lookups - self._stats["misses"]) / lookups, 4) if lookups else 0.0,
+                "avg_auth_ms": round(self._stats["total_auth_ms"] / requests, 4) if requests else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()